@@ -4,6 +4,8 @@ import sqlite3
 import json
 import os
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -410,8 +412,8 @@ def get_trail(trail_id):
     conn.close()
     return _normalize_trail_row(row)
 
-def filter_trails(filters):
-    """Filter trails based on criteria"""
+def filter_trails(filters, raise_errors=False, ids_only=False):
+    """Filter trails based on criteria (only their trail_ids, in order, if ids_only)"""
     logger.debug(f"Filtering trails with filters: {filters}")
     
     try:
@@ -419,7 +421,7 @@ def filter_trails(filters):
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         
-        query = "SELECT * FROM trails WHERE 1=1"
+        query = f"SELECT {'trail_id' if ids_only else '*'} FROM trails WHERE 1=1"
         params = []
         
         if filters.get("max_difficulty"):
@@ -467,7 +469,10 @@ def filter_trails(filters):
         
         logger.debug(f"Executing query: {query[:200]}... with {len(params)} parameters")
         cur.execute(query, params)
-        trails = [_normalize_trail_row(row) for row in cur.fetchall()]
+        if ids_only:
+            trails = [row["trail_id"] for row in cur.fetchall()]
+        else:
+            trails = [_normalize_trail_row(row) for row in cur.fetchall()]
         conn.close()
         
         logger.debug(f"Query returned {len(trails)} trails")
@@ -476,5 +481,101 @@ def filter_trails(filters):
     except Exception as e:
         logger.error(f"Error filtering trails: {e}")
         logger.error(f"Filters were: {filters}")
+        if raise_errors:
+            raise
         # Return empty list on error rather than crashing
         return []
+
+
+# --- Trail query cache ---
+# Parsed trails are held once, by trail_id, and cached filter queries only keep
+# the matching ids (in query order). Both are tied to the trails.db stamp, so a
+# rewrite by init_db or the data pipeline (separate processes) is picked up on
+# the next call.
+# Bound on the ids held across cached filter queries (least recently used
+# queries are dropped first); the parsed trails are one copy of the table.
+TRAIL_QUERY_CACHE_MAX_IDS = 100000
+
+
+def _trails_db_stamp():
+    try:
+        st = os.stat(TRAILS_DB)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _TrailCache:
+    """Parsed trails by trail_id plus an id-only LRU of filter query results."""
+
+    def __init__(self, max_ids):
+        self.max_ids = max_ids
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, stamp):
+        self.stamp = stamp
+        self.trails = None  # trail_id -> parsed trail
+        self.all_ids = ()  # get_all_trails() order
+        self.queries = OrderedDict()  # filter key -> tuple of trail_ids
+        self.query_ids = 0
+
+    def _load(self, stamp):
+        """Trail map for the current stamp, loading the table on first use."""
+        with self._lock:
+            if stamp != self.stamp:
+                self._reset(stamp)
+            if self.trails is not None:
+                return self.trails, self.all_ids
+        trails = get_all_trails()
+        with self._lock:
+            if stamp == self.stamp and self.trails is None:
+                self.trails = {trail["trail_id"]: trail for trail in trails}
+                self.all_ids = tuple(trail["trail_id"] for trail in trails)
+            return self.trails, self.all_ids
+
+    def _query_ids(self, stamp, filter_key):
+        with self._lock:
+            ids = self.queries.get(filter_key) if stamp == self.stamp else None
+            if ids is not None:
+                self.queries.move_to_end(filter_key)
+                return ids
+        ids = tuple(filter_trails(dict(filter_key), raise_errors=True, ids_only=True))
+        with self._lock:
+            if stamp == self.stamp and filter_key not in self.queries and len(ids) <= self.max_ids:
+                self.queries[filter_key] = ids
+                self.query_ids += len(ids)
+                while self.query_ids > self.max_ids:
+                    _, dropped = self.queries.popitem(last=False)
+                    self.query_ids -= len(dropped)
+        return ids
+
+    def get(self, filter_key):
+        stamp = _trails_db_stamp()
+        if stamp is None:
+            raise sqlite3.OperationalError(f"{TRAILS_DB} is not readable")
+        trails, all_ids = self._load(stamp)
+        ids = self._query_ids(stamp, filter_key) if filter_key else all_ids
+        return tuple(trails[trail_id] for trail_id in ids if trail_id in trails)
+
+
+_trail_cache = _TrailCache(TRAIL_QUERY_CACHE_MAX_IDS)
+
+
+def cached_trails(filters=None):
+    """Memoized filter_trails/get_all_trails.
+
+    Returns a tuple of trail dicts shared between callers: copy them before
+    mutating. Failed filter queries are not cached and return an empty tuple,
+    like filter_trails.
+    """
+    try:
+        filter_key = frozenset((filters or {}).items())
+    except TypeError:
+        return tuple(filter_trails(filters) if filters else get_all_trails())
+    try:
+        return _trail_cache.get(filter_key)
+    except Exception:
+        if not filter_key:
+            raise
+        return ()
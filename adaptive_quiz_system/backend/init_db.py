@@ -443,7 +443,7 @@ def seed_trails(limit: int = DEFAULT_TRAIL_LIMIT, use_reference: bool = False) -
     # Use a higher multiplier to get more candidates before diversity selection
     limit_per_region = max(30, int(limit * 1.5) // len(selected_regions))  # Get 1.5x candidates for diversity selection
     
-    trails = load_french_trails(
+    trails, region_counts = load_french_trails(
         regions=selected_regions,
         limit_per_region=limit_per_region,
         total_limit=limit
@@ -453,10 +453,6 @@ def seed_trails(limit: int = DEFAULT_TRAIL_LIMIT, use_reference: bool = False) -
         raise RuntimeError("No trails extracted from shapefile. Ensure the dataset is present locally.")
     
     # Print summary
-    region_counts = {}
-    for trail in trails:
-        region = trail.get("region", "unknown")
-        region_counts[region] = region_counts.get(region, 0) + 1
     print(f"Loaded {len(trails)} trails from {len(region_counts)} regions:")
     for region, count in sorted(region_counts.items()):
         print(f"  {region}: {count} trails")
@@ -531,6 +527,11 @@ def seed_trails(limit: int = DEFAULT_TRAIL_LIMIT, use_reference: bool = False) -
             ),
         )
 
+    # filter_trails always filters is_real and orders by popularity: this lets
+    # SQLite walk the index in order instead of sorting the matching rows.
+    # Built after the bulk insert so rows are not indexed one by one.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_trails_real_popularity ON trails(is_real, popularity)")
+
     conn.commit()
     conn.close()
     print(f"trails.db initialized with {len(trails)} real French Alps itineraries")
@@ -17,6 +17,13 @@ OPEN_METEO_BASE_URL = "https://api.open-meteo.com/v1/forecast"
 # or queue, so the server doesn't send the response within the limit.
 WEATHER_REQUEST_TIMEOUT = (4, 10)  # 4s to connect, 10s to receive full response
 
+# (desired, forecast) pairs that are acceptable without being an exact match,
+# with the score the recommendation criteria give them
+COMPATIBLE_WEATHER = {
+    ("sunny", "cloudy"): 0.8,  # Cloudy is acceptable for sunny (partial match)
+    ("rainy", "cloudy"): 0.7,  # Cloudy is acceptable for rainy (less ideal but not a mismatch)
+}
+
 
 def normalize_weather_condition(weather_code: int) -> str:
     """
@@ -326,13 +333,5 @@ def weather_matches(desired_weather: str, forecast_weather: Optional[str]) -> bo
         return True
     
     # Some weather conditions are compatible
-    # Cloudy is acceptable for sunny (partial match)
-    if desired_weather == "sunny" and forecast_weather == "cloudy":
-        return True
-    
-    # Cloudy is acceptable for rainy (less ideal but not a mismatch)
-    if desired_weather == "rainy" and forecast_weather == "cloudy":
-        return True
-    
-    return False
+    return (desired_weather, forecast_weather) in COMPATIBLE_WEATHER
 
@@ -16,12 +16,26 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import re
 import sqlite3
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from typing import Dict, Iterable, List, Sequence, Tuple
 
 import requests  # type: ignore
 import shapefile  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+from urllib3.util.retry import Retry  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # Optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,6 +43,7 @@ DATA_DIR = BASE_DIR / "data" / "source"
 SHAPEFILE_PATH = DATA_DIR / "hiking_foot_routes_lineLine.shp"
 DEFAULT_OUTPUT = BASE_DIR / "data_pipeline" / "french_trails.json"
 TRAILS_DB = BASE_DIR / "backend" / "trails.db"
+ELEVATION_CACHE_DB = DATA_DIR / "elevation_cache.db"
 
 # Geographic envelopes for various French regions (min_lon, min_lat, max_lon, max_lat)
 FRENCH_REGIONS = {
@@ -69,7 +84,99 @@ FRENCH_REGIONS = {
 # Default: French Alps (for backward compatibility)
 FRENCH_ALPS_BBOX = FRENCH_REGIONS["french_alps"]["bbox"]
 MAX_ELEVATION_SAMPLES = 180
+ELEVATION_BATCH_POINTS = 1000  # Locations sent per Open-Elevation request
+ELEVATION_WORKERS = 4  # Concurrent Open-Elevation requests
+ELEVATION_CACHE_SCALE = 100_000  # Cache keys are coordinates in 1e-5 degrees (~1 m, finer than SRTM)
+OPEN_ELEVATION_URL = "https://api.open-elevation.com/api/v1/lookup"
+
+# Upper bounds (exclusive) of the diversity categories used by _select_diverse_trails
+DURATION_CATEGORY_EDGES = (120, 240, 480, 720, 1440)  # <2h, 2-4h, 4-8h, 8-12h, 12-24h, >24h
+DIFFICULTY_CATEGORY_EDGES = (4.0, 7.0)  # Easy, Medium, Hard
+DURATION_CATEGORY_LABELS = ("< 2h", "2-4h", "4-8h", "8-12h", "12-24h", "> 24h")
+DIFFICULTY_CATEGORY_LABELS = ("Easy", "Medium", "Hard")
 MIN_NAMED_DISTANCE_KM = 1.0  # Lowered from 2.0 to allow shorter trails for diversity
+LOOP_ENDPOINT_KM = 0.2  # Start/end closer than this make the trail a loop
+KM_PER_DEGREE = 111.32  # Length of one degree of latitude
+
+# OSM sac_scale / difficulty values mapped to the 1-10 difficulty scale
+DIFFICULTY_BY_SCALE = {
+    "hiking": 3.0,
+    "easy": 3.0,
+    "moderate": 5.0,
+    "demanding_mountain_hiking": 6.5,
+    "alpine_hiking": 8.0,
+    "advanced_hiking": 7.0,
+    "difficult": 8.5,
+    "hard": 8.5,
+    "extreme": 9.5,
+}
+
+# Substrings of a trail name that hint at its landscape
+LANDSCAPE_BY_NAME_TOKEN = {
+    "lac": "lake",
+    "glacier": "glacier",
+    "forest": "forest",
+    "mont": "peaks",
+    "peak": "peaks",
+    "col": "peaks",
+    "dent": "peaks",
+    "river": "river",
+}
+LANDSCAPE_ORDER = ("lake", "glacier", "forest", "peaks", "river")
+# Zero-width lookahead so overlapping tokens (e.g. "lac" inside "glacier") are all found in one scan
+_LANDSCAPE_TOKEN_RE = re.compile("(?=(" + "|".join(LANDSCAPE_BY_NAME_TOKEN) + "))")
+
+# Declared OSM distance: a number with an optional km/m unit (kilometres by default)
+_DISTANCE_RE = re.compile(r"^\s*([0-9]+(?:\.[0-9]*)?|\.[0-9]+)\s*(km|m)?\s*$", re.IGNORECASE)
+
+# DBF attributes read by the loader; every other shapefile column is ignored
+PROPERTY_FIELDS: Tuple[str, ...] = (
+    "route",
+    "name",
+    "ref",
+    "short_name",
+    "osm_id",
+    "id",
+    "sac_scale",
+    "difficulty",
+    "distance",
+    "note",
+    "description",
+    "hazard",
+    "slippery",
+    "exposed",
+    "avalanche",
+    "dog",
+    "bicycle",
+    "wheelchair",
+    "natural",
+    "landuse",
+    "waterway",
+)
+
+# Column order used when persisting trails into trails.db
+TRAIL_DB_COLUMNS: Tuple[str, ...] = (
+    "trail_id",
+    "name",
+    "difficulty",
+    "distance",
+    "duration",
+    "elevation_gain",
+    "trail_type",
+    "landscapes",
+    "popularity",
+    "safety_risks",
+    "accessibility",
+    "closed_seasons",
+    "description",
+    "latitude",
+    "longitude",
+    "coordinates",
+    "region",
+    "source",
+    "is_real",
+    "elevation_profile",
+)
 
 
 def _verify_shapefile(path: Path) -> None:
@@ -92,15 +199,13 @@ def _mercator_to_wgs84(x: float, y: float) -> Tuple[float, float]:
     return lon, lat
 
 
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    radius = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
-    )
-    return radius * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def _mercator_to_wgs84_batch(points: Sequence[Sequence[float]]) -> List[Tuple[float, float]]:
+    """Convert a whole EPSG:3857 polyline to longitude/latitude pairs."""
+    lon_scale = 180.0 / 20037508.34
+    lat_scale = math.pi / 20037508.34
+    half_pi = math.pi / 2.0
+    atan, exp, degrees = math.atan, math.exp, math.degrees
+    return [(x * lon_scale, degrees(2 * atan(exp(y * lat_scale)) - half_pi)) for x, y in points]
 
 
 def _coerce_str(value) -> str:
@@ -111,21 +216,11 @@ def _coerce_str(value) -> str:
     return str(value)
 
 
+@lru_cache(maxsize=64)
 def _parse_difficulty(raw: str | None) -> float:
-    mapping = {
-        "hiking": 3.0,
-        "easy": 3.0,
-        "moderate": 5.0,
-        "demanding_mountain_hiking": 6.5,
-        "alpine_hiking": 8.0,
-        "advanced_hiking": 7.0,
-        "difficult": 8.5,
-        "hard": 8.5,
-        "extreme": 9.5,
-    }
     if not raw:
         return 5.0
-    return mapping.get(raw.lower(), 5.0)
+    return DIFFICULTY_BY_SCALE.get(raw.lower(), 5.0)
 
 
 def _estimate_difficulty_from_characteristics(
@@ -215,27 +310,36 @@ def _estimate_duration_minutes(distance_km: float | None, elevation_gain: int |
     return int(max(30, total_time))
 
 
-def _parse_landscapes(props: Dict[str, str]) -> str:
-    landscapes: List[str] = []
-    name = props.get("name", "").lower()
-    if "lac" in name or props.get("natural") == "water":
-        landscapes.append("lake")
-    if "glacier" in name:
-        landscapes.append("glacier")
-    if props.get("landuse") == "forest" or "forest" in name:
-        landscapes.append("forest")
-    if any(token in name for token in ["mont", "peak", "col", "dent"]):
-        landscapes.append("peaks")
-    if "river" in name or props.get("waterway"):
-        landscapes.append("river")
-    if not landscapes:
-        landscapes.append("alpine")
-    return ",".join(dict.fromkeys(landscapes))  # preserve order, remove duplicates
-
-
-def _parse_safety(props: Dict[str, str]) -> str:
+def _parse_declared_distance(raw: str) -> float | None:
+    """Parse an OSM ``distance`` tag ("12", "12.5 km", "800 m") into kilometres."""
+    match = _DISTANCE_RE.match(raw)
+    if not match:
+        return None
+    value = float(match.group(1))
+    return value / 1000.0 if (match.group(2) or "").lower() == "m" else value
+
+
+@lru_cache(maxsize=1024)
+def _landscapes_from_name(name: str) -> frozenset:
+    """Landscapes hinted at by a trail name (names repeat a lot across OSM routes)."""
+    return frozenset(LANDSCAPE_BY_NAME_TOKEN[token] for token in _LANDSCAPE_TOKEN_RE.findall(name.lower()))
+
+
+def _parse_landscapes(props: Dict) -> str:
+    found = set(_landscapes_from_name(_coerce_str(props.get("name"))))
+    if props.get("natural") == "water":
+        found.add("lake")
+    if props.get("landuse") == "forest":
+        found.add("forest")
+    if props.get("waterway"):
+        found.add("river")
+    landscapes = [landscape for landscape in LANDSCAPE_ORDER if landscape in found]
+    return ",".join(landscapes) if landscapes else "alpine"
+
+
+def _parse_safety(props: Dict) -> str:
     risks: List[str] = []
-    hazard = props.get("hazard")
+    hazard = _coerce_str(props.get("hazard"))
     if hazard:
         risks.append(hazard)
     if props.get("slippery") == "yes":
@@ -247,7 +351,7 @@ def _parse_safety(props: Dict[str, str]) -> str:
     return ",".join(risks) if risks else "low"
 
 
-def _parse_accessibility(props: Dict[str, str]) -> str:
+def _parse_accessibility(props: Dict) -> str:
     tags: List[str] = []
     if props.get("dog") == "yes":
         tags.append("dog-friendly")
@@ -258,65 +362,260 @@ def _parse_accessibility(props: Dict[str, str]) -> str:
     return ",".join(tags)
 
 
+def _json_dumps(value) -> str:
+    """Encode ``value`` with orjson when it is installed, else with the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value)
+
+
 def _build_geojson(coords: Sequence[Tuple[float, float]]) -> str:
-    return json.dumps({"type": "LineString", "coordinates": [[lon, lat] for lon, lat in coords]})
+    # Both encoders emit tuples as arrays, so the coordinate pairs are passed through as-is
+    return _json_dumps({"type": "LineString", "coordinates": coords})
 
 
 def _calc_distances(coords: Sequence[Tuple[float, float]]) -> Tuple[float, List[float]]:
-    cumulative = [0.0]
+    """
+    Return the total length and the cumulative haversine distance (km) at each vertex.
+
+    Single pass over the polyline: the previous vertex's radians and cosine
+    are carried forward, so each vertex is converted once and no per-segment
+    lists are built before accumulating.
+    """
+    if not coords:
+        return 0.0, [0.0]
+    radians, sin, cos, sqrt, atan2 = math.radians, math.sin, math.cos, math.sqrt, math.atan2
+    diameter = 2 * 6371.0
+    lon, lat = coords[0]
+    lat1, lon1 = radians(lat), radians(lon)
+    cos1 = cos(lat1)
     total = 0.0
-    for idx in range(1, len(coords)):
-        lon1, lat1 = coords[idx - 1]
-        lon2, lat2 = coords[idx]
-        segment = _haversine_km(lat1, lon1, lat2, lon2)
-        total += segment
-        cumulative.append(total)
+    cumulative = [total]
+    append = cumulative.append
+    for lon, lat in islice(coords, 1, None):
+        lat2, lon2 = radians(lat), radians(lon)
+        cos2 = cos(lat2)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * sin((lon2 - lon1) / 2) ** 2
+        total += diameter * atan2(sqrt(a), sqrt(1 - a))
+        append(total)
+        lat1, lon1, cos1 = lat2, lon2, cos2
     return total, cumulative
 
 
-def _sample_coordinates(coords: Sequence[Tuple[float, float]], max_points: int) -> List[Tuple[float, float]]:
-    if len(coords) <= max_points:
-        return list(coords)
-    step = len(coords) / max_points
-    sampled = [coords[int(i * step)] for i in range(max_points)]
-    if sampled[-1] != coords[-1]:
-        sampled[-1] = coords[-1]
-    return sampled
+def _sample_indices(count: int, max_points: int) -> Sequence[int]:
+    """Indices of at most ``max_points`` evenly spaced vertices, always keeping both endpoints."""
+    if count <= max_points:
+        return range(count)
+    if max_points < 2:
+        return range(count - 1, count)[:max_points]
+    last = count - 1
+    span = max_points - 1
+    return [i * last // span for i in range(max_points)]
 
 
-def _fetch_elevation_profile(coords: Sequence[Tuple[float, float]]) -> Tuple[List[Dict[str, float]], int]:
-    if not coords:
-        return [], 0
-    sampled = _sample_coordinates(coords, MAX_ELEVATION_SAMPLES)
+def _new_elevation_session() -> requests.Session:
+    """
+    HTTP session shared by all Open-Elevation lookups.
+
+    Keeps connections alive across batches (one TLS handshake per pooled
+    connection instead of per request) and retries gateway errors. The
+    lookup is read-only, so POST is safe to retry.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+_ELEVATION_SESSION = _new_elevation_session()
+
+
+def _fetch_elevations(points: Sequence[Tuple[float, float]]) -> List[float] | None:
+    """
+    Look up the elevation of every (lon, lat) point in a single Open-Elevation request.
+
+    Returns None when the API answers with a different number of results.
+    """
     payload = [
         {"latitude": lat, "longitude": lon}
-        for lon, lat in sampled  # API expects lat/lon ordering
+        for lon, lat in points  # API expects lat/lon ordering
     ]
-    response = requests.post(
-        "https://api.open-elevation.com/api/v1/lookup",
+    response = _ELEVATION_SESSION.post(
+        OPEN_ELEVATION_URL,
         json={"locations": payload},
         timeout=20,
     )
     response.raise_for_status()
     data = response.json()
     results = data.get("results", [])
-    if len(results) != len(sampled):
-        return [], 0
+    if len(results) != len(points):
+        return None
+    return [float(point.get("elevation", 0.0)) for point in results]
 
-    _, cumulative = _calc_distances(sampled)
+
+def _build_elevation_profile(
+    distances_km: Sequence[float], elevations: Sequence[float]
+) -> Tuple[List[Dict[str, float]], int]:
+    """Pair sampled elevations with their distance along the trail and sum the positive gain."""
     profile: List[Dict[str, float]] = []
     gain = 0.0
-    for idx, point in enumerate(results):
-        elevation = float(point.get("elevation", 0.0))
-        profile.append({"distance_m": round(cumulative[idx] * 1000, 1), "elevation_m": elevation})
+    for idx, elevation in enumerate(elevations):
+        profile.append({"distance_m": round(distances_km[idx] * 1000, 1), "elevation_m": elevation})
         if idx > 0:
-            diff = elevation - profile[idx - 1]["elevation_m"]
+            diff = elevation - elevations[idx - 1]
             if diff > 0:
                 gain += diff
 
     return profile, int(round(gain))
 
 
+def _open_elevation_cache(path: Path) -> sqlite3.Connection | None:
+    """Open (creating if needed) the on-disk elevation cache; None if it is unusable."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS elevations (
+                lat INTEGER NOT NULL,
+                lon INTEGER NOT NULL,
+                elevation REAL NOT NULL,
+                PRIMARY KEY (lat, lon)
+            ) WITHOUT ROWID
+            """
+        )
+        return conn
+    except sqlite3.Error as exc:
+        print(f"[WARN] Elevation cache disabled ({path}): {exc}")
+        return None
+
+
+def _elevation_key(point: Tuple[float, float]) -> Tuple[int, int]:
+    lon, lat = point
+    return round(lat * ELEVATION_CACHE_SCALE), round(lon * ELEVATION_CACHE_SCALE)
+
+
+def _read_elevation_cache(cache: sqlite3.Connection, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], float]:
+    unique_keys = list(dict.fromkeys(keys))
+    found: Dict[Tuple[int, int], float] = {}
+    chunk = 400  # Two bound parameters per key, kept under SQLite's variable limit
+    for start in range(0, len(unique_keys), chunk):
+        part = unique_keys[start:start + chunk]
+        rows = cache.execute(
+            f"SELECT lat, lon, elevation FROM elevations WHERE (lat, lon) IN (VALUES {','.join('(?, ?)' for _ in part)})",
+            [value for key in part for value in key],
+        )
+        found.update(((lat, lon), elevation) for lat, lon, elevation in rows)
+    return found
+
+
+def _write_elevation_cache(cache: sqlite3.Connection, elevations: Dict[Tuple[int, int], float]) -> None:
+    with cache:
+        cache.executemany(
+            "INSERT OR IGNORE INTO elevations (lat, lon, elevation) VALUES (?, ?, ?)",
+            [(lat, lon, elevation) for (lat, lon), elevation in elevations.items()],
+        )
+
+
+def _fetch_elevation_profiles(
+    sampled_per_trail: Sequence[Sequence[Tuple[float, float]]],
+    distances_per_trail: Sequence[Sequence[float]],
+    batch_points: int = ELEVATION_BATCH_POINTS,
+    cache: sqlite3.Connection | None = None,
+    max_workers: int = ELEVATION_WORKERS,
+) -> List[Tuple[List[Dict[str, float]], int] | Exception]:
+    """
+    Build the elevation profile of many trails with as few API requests as possible.
+
+    ``distances_per_trail`` holds, for each sampled point, its cumulative
+    distance (km) along the full trail. Points already present in ``cache``
+    are not requested again. The uncached points of whole trails are packed
+    into requests of at most ``batch_points`` locations, which are sent
+    concurrently on ``max_workers`` threads, and the answers are stored back
+    into the cache. Each entry of the result is
+    ``(profile, gain)``, or the exception raised by the request that covered
+    that trail so callers can apply their own fallback.
+    """
+    keys_per_trail = [[_elevation_key(point) for point in sampled] for sampled in sampled_per_trail]
+    known: Dict[Tuple[int, int], float] = {}
+    if cache is not None:
+        known = _read_elevation_cache(cache, (key for keys in keys_per_trail for key in keys))
+
+    # Plan the requests: each uncached point is requested once, and a trail's
+    # points are never split across requests.
+    batches: List[Dict[Tuple[int, int], Tuple[float, float]]] = [{}]
+    planned: set = set()
+    for keys, sampled in zip(keys_per_trail, sampled_per_trail):
+        needed = {key: point for key, point in zip(keys, sampled) if key not in known and key not in planned}
+        if batches[-1] and len(batches[-1]) + len(needed) > batch_points:
+            batches.append({})
+        batches[-1].update(needed)
+        planned.update(needed)
+    batches = [batch for batch in batches if batch]
+
+    # Outcome of the request that owned each point that could not be resolved
+    failures: Dict[Tuple[int, int], Exception | None] = {}
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+            futures = [(executor.submit(_fetch_elevations, list(batch.values())), batch) for batch in batches]
+            for future, batch in futures:
+                try:
+                    elevations = future.result()
+                except Exception as exc:  # noqa: BLE001 - reported per trail by the caller
+                    failures.update(dict.fromkeys(batch, exc))
+                    continue
+                if elevations is None:
+                    failures.update(dict.fromkeys(batch, None))  # Incomplete answer
+                    continue
+                fetched = dict(zip(batch, elevations))
+                known.update(fetched)
+                if cache is not None:
+                    _write_elevation_cache(cache, fetched)
+
+    results: List[Tuple[List[Dict[str, float]], int] | Exception] = []
+    for keys, distances in zip(keys_per_trail, distances_per_trail):
+        unresolved = next((key for key in keys if key not in known), None)
+        if unresolved is None:
+            results.append(_build_elevation_profile(distances, [known[key] for key in keys]))
+        else:
+            # A failed request is reported; an incomplete answer keeps an empty profile
+            failure = failures.get(unresolved)
+            results.append(failure if failure is not None else ([], 0))
+    return results
+
+
+def _apply_elevation(candidate: Dict, profile: List[Dict[str, float]], elevation_gain: int) -> None:
+    """Fill in the elevation-dependent fields (difficulty, duration, popularity) of a candidate."""
+    total_distance_km = candidate["_distance_km"]
+    raw_difficulty = candidate["_raw_difficulty"]
+    # If difficulty defaulted to 5.0 (medium) because the field was missing or didn't match,
+    # try to estimate from trail characteristics (elevation gain, distance)
+    if raw_difficulty == 5.0 and not candidate["_raw_difficulty_value"]:
+        # No difficulty field found in source - estimate from characteristics
+        difficulty = _estimate_difficulty_from_characteristics(
+            total_distance_km, elevation_gain
+        )
+    else:
+        # Use the parsed difficulty from source data (even if it's 5.0 from a match)
+        difficulty = raw_difficulty
+
+    # Estimate duration with elevation gain for more accurate multi-day trail detection
+    duration = _estimate_duration_minutes(total_distance_km, elevation_gain)
+    popularity = round(min(9.8, 6.0 + total_distance_km / 5.0 + difficulty / 10.0), 1)
+
+    candidate["difficulty"] = float(difficulty) if difficulty is not None else 5.0
+    candidate["duration"] = int(duration) if duration is not None else 120
+    candidate["elevation_gain"] = int(elevation_gain) if elevation_gain is not None else 0
+    candidate["elevation_profile"] = profile if profile is not None else []
+    candidate["popularity"] = float(popularity) if popularity is not None else 6.0
+
+
 def _trail_name(props: Dict[str, str], centroid: Tuple[float, float]) -> str:
     for key in ("name", "ref", "short_name"):
         value = _coerce_str(props.get(key)).strip()
@@ -325,43 +624,80 @@ def _trail_name(props: Dict[str, str], centroid: Tuple[float, float]) -> str:
     return ""  # Require explicit name – unnamed features will be discarded
 
 
-def _is_in_bbox(coords: Sequence[Tuple[float, float]], bbox: Tuple[float, float, float, float]) -> bool:
-    min_lon, min_lat, max_lon, max_lat = bbox
-    return any(min_lon <= lon <= max_lon and min_lat <= lat <= max_lat for lon, lat in coords)
+def _bbox_overlaps(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> bool:
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+def _match_region(
+    coords: Sequence[Tuple[float, float]],
+    extent: Tuple[float, float, float, float],
+    open_regions: Sequence[Dict],
+) -> Dict | None:
+    """
+    Return the first region (in priority order) containing at least one vertex.
+
+    Regions are first decided from the trail envelope: no overlap rules a
+    region out, full containment makes it a guaranteed match. The regions
+    left undecided ahead of the first guaranteed one are then checked in a
+    single pass over the vertices, which stops as soon as the
+    highest-priority remaining region is hit.
+    """
+    pending: List[Dict] = []
+    for region_info in open_regions:
+        if not _bbox_overlaps(extent, region_info["bbox"]):
+            continue
+        min_lon, min_lat, max_lon, max_lat = region_info["bbox"]
+        if min_lon <= extent[0] and extent[2] <= max_lon and min_lat <= extent[1] and extent[3] <= max_lat:
+            if not pending:
+                return region_info
+            pending.append(region_info)
+            best = len(pending) - 1  # Every vertex is inside: lower priorities are irrelevant
+            break
+        pending.append(region_info)
+    else:
+        best = len(pending)
+        if not pending:
+            return None
+
+    bboxes = [region_info["bbox"] for region_info in pending[:best]]
+    for lon, lat in coords:
+        for index in range(best):
+            min_lon, min_lat, max_lon, max_lat = bboxes[index]
+            if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
+                best = index
+                break
+        if best == 0:
+            break
+    return pending[best] if best < len(pending) else None
+
+
+def _endpoints_close(lon1: float, lat1: float, lon2: float, lat2: float, km: float = LOOP_ENDPOINT_KM) -> bool:
+    """
+    Equirectangular proximity test for two nearby points.
+
+    At a few hundred metres the planar approximation is as accurate as the
+    haversine formula, and comparing squared distances avoids any sqrt.
+    """
+    dlat = lat2 - lat1
+    dlon = (lon2 - lon1) * math.cos(math.radians((lat1 + lat2) * 0.5))
+    return (dlat * dlat + dlon * dlon) * (KM_PER_DEGREE * KM_PER_DEGREE) < km * km
 
 
 def _trail_type_from_coords(coords: Sequence[Tuple[float, float]]) -> str:
     if len(coords) < 2:
         return "one_way"
-    start = coords[0]
-    end = coords[-1]
-    close_enough = _haversine_km(start[1], start[0], end[1], end[0]) < 0.2
-    return "loop" if close_enough else "one_way"
+    (start_lon, start_lat), (end_lon, end_lat) = coords[0], coords[-1]
+    return "loop" if _endpoints_close(start_lon, start_lat, end_lon, end_lat) else "one_way"
 
 
 def _get_trail_category(trail: Dict) -> Tuple[int, int]:
     """Get the category (duration, difficulty) for a trail."""
     duration = trail.get("duration", 120)
     difficulty = trail.get("difficulty", 5.0)
-    
-    duration_ranges = [
-        (0, 120), (120, 240), (240, 480), (480, 720), (720, 1440), (1440, float('inf'))
-    ]
-    difficulty_ranges = [(0.0, 4.0), (4.0, 7.0), (7.0, 10.0)]
-    
-    dur_cat = 0
-    for i, (min_dur, max_dur) in enumerate(duration_ranges):
-        if min_dur <= duration < max_dur:
-            dur_cat = i
-            break
-    
-    diff_cat = 0
-    for i, (min_diff, max_diff) in enumerate(difficulty_ranges):
-        if min_diff <= difficulty < max_diff:
-            diff_cat = i
-            break
-    
-    return (dur_cat, diff_cat)
+    return (
+        bisect_right(DURATION_CATEGORY_EDGES, duration),
+        bisect_right(DIFFICULTY_CATEGORY_EDGES, difficulty),
+    )
 
 
 def _select_diverse_trails(
@@ -387,26 +723,12 @@ def _select_diverse_trails(
     if len(trails) <= target_count:
         return trails
     
-    # Define categories
-    duration_ranges = [
-        (0, 120),      # < 2 hours
-        (120, 240),    # 2-4 hours
-        (240, 480),    # 4-8 hours
-        (480, 720),    # 8-12 hours
-        (720, 1440),   # 12-24 hours
-        (1440, float('inf'))  # > 24 hours (multi-day)
-    ]
-    
-    difficulty_ranges = [
-        (0.0, 4.0),    # Easy
-        (4.0, 7.0),    # Medium
-        (7.0, 10.0)    # Hard
-    ]
-    
-    # Categorize trails
+    # Categorize trails (computed once per trail, reused by the second pass)
+    categories: Dict[int, Tuple[int, int]] = {}
     categorized: Dict[Tuple[int, int], List[Dict]] = {}
     for trail in trails:
         category = _get_trail_category(trail)
+        categories[id(trail)] = category
         if category not in categorized:
             categorized[category] = []
         categorized[category].append(trail)
@@ -429,8 +751,8 @@ def _select_diverse_trails(
     remaining_slots = target_count - len(selected)
     if remaining_slots > 0:
         # Calculate how many trails per category we have
-        category_counts = {cat: len([t for t in selected if _get_trail_category(t) == cat]) 
-                          for cat in categorized.keys()}
+        selected_counts = Counter(categories[id(t)] for t in selected)
+        category_counts = {cat: selected_counts.get(cat, 0) for cat in categorized}
         
         # Sort categories by how underrepresented they are
         all_categories = sorted(categorized.keys(), 
@@ -460,6 +782,49 @@ def _select_diverse_trails(
     return selected
 
 
+def _finalize_trail(candidate: Dict) -> Dict:
+    """
+    Build the full trail record for a candidate kept after diversity selection.
+
+    Description, landscape/safety/accessibility tags and the GeoJSON geometry
+    are only needed for trails that are actually returned, so they are derived
+    here from the raw properties and coordinates kept on the candidate.
+    """
+    props = candidate["_props"]
+    name = candidate["name"]
+    region_name = candidate["region"]
+    landscapes = _parse_landscapes(props)
+    safety = _parse_safety(props)
+    accessibility = _parse_accessibility(props)
+    description = _coerce_str(props.get("note") or props.get("description"))
+    if not description:
+        description = f"Authentic {candidate['_region_description']} itinerary along {name}."
+
+    # Ensure all fields are non-null with default values
+    return {
+        "trail_id": candidate["trail_id"],
+        "name": name,
+        "description": description or f"Hiking trail in {region_name}",
+        "difficulty": candidate["difficulty"],
+        "distance": candidate["distance"],
+        "duration": candidate["duration"],
+        "elevation_gain": candidate["elevation_gain"],
+        "elevation_profile": candidate["elevation_profile"],
+        "trail_type": candidate["trail_type"],
+        "landscapes": landscapes or "alpine",
+        "popularity": candidate["popularity"],
+        "safety_risks": safety or "low",
+        "accessibility": accessibility or "",
+        "closed_seasons": "",
+        "latitude": candidate["latitude"],
+        "longitude": candidate["longitude"],
+        "coordinates": _build_geojson(list(zip(candidate["_lons"], candidate["_lats"]))),
+        "region": region_name,
+        "source": "french_osm_shapefile",
+        "is_real": 1,
+    }
+
+
 def load_french_trails(
     shapefile_path: Path = SHAPEFILE_PATH,
     *,
@@ -467,7 +832,7 @@ def load_french_trails(
     bbox: Tuple[float, float, float, float] | None = None,
     limit_per_region: int | None = None,
     total_limit: int | None = None,
-) -> List[Dict]:
+) -> Tuple[List[Dict], Dict[str, int]]:
     """
     Parse the shapefile and return curated French trails from specified regions.
     
@@ -480,11 +845,16 @@ def load_french_trails(
         total_limit: Maximum total trails across all regions
     
     Returns:
-        List of trail dictionaries
+        Tuple of (list of trail dictionaries, number of returned trails per region)
     """
     _verify_shapefile(shapefile_path)
     reader = shapefile.Reader(str(shapefile_path), encoding="latin1")
     fields = [field[0] for field in reader.fields[1:]]
+    # Resolve the record positions of the attributes we read once, instead of
+    # zipping every record into a dict of all its columns
+    field_positions = [(name, fields.index(name)) for name in PROPERTY_FIELDS if name in fields]
+    route_idx = fields.index("route") if "route" in fields else None
+    osm_id_idx = fields.index("osm_id") if "osm_id" in fields else None
 
     # Determine which regions to load
     if bbox:
@@ -504,73 +874,79 @@ def load_french_trails(
         ]
 
     if not regions_to_load:
-        return []
+        return [], {}
 
     all_trails: List[Dict] = []
     region_counts: Dict[str, int] = {r["name"]: 0 for r in regions_to_load}
 
-    # Process shapes in a deterministic order for reproducibility
-    # Convert to list and sort by a stable identifier (osm_id) for deterministic order
-    shapes_and_records = list(zip(reader.shapes(), reader.records()))
-    # Sort by osm_id if available, otherwise by first coordinate for stability
-    shapes_and_records.sort(key=lambda x: (
-        dict(zip([field[0] for field in reader.fields[1:]], x[1])).get("osm_id") or 0,
-        x[0].points[0][0] if x[0].points else 0,  # First X coordinate as tiebreaker
-        x[0].points[0][1] if x[0].points else 0  # First Y coordinate as second tiebreaker
-    ))
+    # Stream the shapefile and keep only hiking/foot polylines whose envelope
+    # touches a requested region; everything else is dropped before sorting
+    # and before any vertex is projected.
+    shapes_and_records = []
+    for shape_record in reader.iterShapeRecords():
+        shape, record = shape_record.shape, shape_record.record
+        if shape.shapeType != shapefile.POLYLINE:
+            continue
+        route_type = _coerce_str(record[route_idx]) if route_idx is not None else ""
+        if route_type not in {"hiking", "foot"}:
+            continue
+        # The shapefile stores each shape's envelope; Web Mercator is monotonic in
+        # both axes, so projecting its two corners gives the exact WGS84 envelope.
+        shape_envelope = _mercator_to_wgs84(*shape.bbox[:2]) + _mercator_to_wgs84(*shape.bbox[2:])
+        if not any(_bbox_overlaps(shape_envelope, r["bbox"]) for r in regions_to_load):
+            continue
+        shapes_and_records.append((shape, record, shape_envelope))
+
+    # Process shapes in a deterministic order for reproducibility: by osm_id,
+    # with the (stable) sort keeping file order for shapes without one
+    if osm_id_idx is not None:
+        shapes_and_records.sort(key=lambda x: x[1][osm_id_idx] or 0)
 
     # Collect more candidates than needed for diversity selection
     # We'll apply diversity selection at the end
     candidate_multiplier = 1.5 if total_limit else 1.0
     effective_limit = int(total_limit * candidate_multiplier) if total_limit else None
     
-    for shape, record in shapes_and_records:
+    # Regions that can still accept trails, kept in priority order
+    open_regions = list(regions_to_load)
+
+    for shape, record, shape_envelope in shapes_and_records:
         if effective_limit and len(all_trails) >= effective_limit:
             break
-        if shape.shapeType != shapefile.POLYLINE:
+        if not open_regions:
+            break  # Every region reached its limit
+
+        # Regions can fill up while iterating, so re-check against the open ones
+        candidate_regions = [r for r in open_regions if _bbox_overlaps(shape_envelope, r["bbox"])]
+        if not candidate_regions:
             continue
 
         coords_mercator = shape.points
-        coords_wgs84 = [_mercator_to_wgs84(x, y) for x, y in coords_mercator]
+        coords_wgs84 = _mercator_to_wgs84_batch(coords_mercator)
         if not coords_wgs84 or len(coords_wgs84) < 2:
             continue
 
-        # Find which region this trail belongs to
-        matching_region = None
-        for region_info in regions_to_load:
-            if _is_in_bbox(coords_wgs84, region_info["bbox"]):
-                # Check if we've reached the limit for this region
-                if limit_per_region and region_counts[region_info["name"]] >= limit_per_region:
-                    continue
-                matching_region = region_info
-                break
+        # Unzip once: the envelope and the centroid both reuse these columns
+        lons, lats = zip(*coords_wgs84)
+        extent = (min(lons), min(lats), max(lons), max(lats))
 
+        # Find which region this trail belongs to (full regions are already excluded)
+        matching_region = _match_region(coords_wgs84, extent, candidate_regions)
         if not matching_region:
             continue
 
-        props = dict(zip(fields, record))
-        route_type = _coerce_str(props.get("route"))
-        if route_type not in {"hiking", "foot"}:
-            continue
+        props = {name: record[idx] for name, idx in field_positions}
 
-        centroid_lat = sum(lat for _, lat in coords_wgs84) / len(coords_wgs84)
-        centroid_lon = sum(lon for lon, _ in coords_wgs84) / len(coords_wgs84)
+        centroid_lat = sum(lats) / len(lats)
+        centroid_lon = sum(lons) / len(lons)
         name = _trail_name(props, (centroid_lat, centroid_lon))
         if not name:
             continue
 
         total_distance_km, cumulative = _calc_distances(coords_wgs84)
-        declared_distance = _coerce_str(props.get("distance", "")).strip()
-        if declared_distance:
-            try:
-                if "km" in declared_distance.lower():
-                    total_distance_km = float(declared_distance.lower().replace("km", "").strip())
-                elif "m" in declared_distance.lower():
-                    total_distance_km = float(declared_distance.lower().replace("m", "").strip()) / 1000.0
-                else:
-                    total_distance_km = float(declared_distance)
-            except ValueError:
-                pass
+        declared_distance_km = _parse_declared_distance(_coerce_str(props.get("distance")))
+        if declared_distance_km is not None:
+            total_distance_km = declared_distance_km
 
         if total_distance_km < MIN_NAMED_DISTANCE_KM:
             continue
@@ -578,65 +954,60 @@ def load_french_trails(
         sac_scale = _coerce_str(props.get("sac_scale"))
         raw_difficulty_value = sac_scale or props.get("difficulty")
         raw_difficulty = _parse_difficulty(raw_difficulty_value)
-        landscapes = _parse_landscapes({k: _coerce_str(v) for k, v in props.items()})
-        safety = _parse_safety({k: _coerce_str(v) for k, v in props.items()})
-        accessibility = _parse_accessibility({k: _coerce_str(v) for k, v in props.items()})
         trail_type = _trail_type_from_coords(coords_wgs84)
 
-        try:
-            elevation_profile, elevation_gain = _fetch_elevation_profile(coords_wgs84)
-        except Exception as exc:  # noqa: BLE001 - keep the pipeline resilient
-            print(f"[WARN] Elevation profile failed for {name}: {exc}")
-            elevation_profile = []
-            elevation_gain = int(total_distance_km * 75)
-        
-        # If difficulty defaulted to 5.0 (medium) because the field was missing or didn't match,
-        # try to estimate from trail characteristics (elevation gain, distance)
-        if raw_difficulty == 5.0 and not raw_difficulty_value:
-            # No difficulty field found in source - estimate from characteristics
-            difficulty = _estimate_difficulty_from_characteristics(
-                total_distance_km, elevation_gain
-            )
-        else:
-            # Use the parsed difficulty from source data (even if it's 5.0 from a match)
-            difficulty = raw_difficulty
-        
-        # Estimate duration with elevation gain for more accurate multi-day trail detection
-        duration = _estimate_duration_minutes(total_distance_km, elevation_gain)
-
         region_name = matching_region["name"]
         trail_id = f"{region_name}_{props.get('osm_id') or props.get('id') or len(all_trails)}"
-        description = _coerce_str(props.get("note") or props.get("description"))
-        if not description:
-            description = f"Authentic {matching_region['description']} itinerary along {name}."
-        popularity = round(min(9.8, 6.0 + total_distance_km / 5.0 + difficulty / 10.0), 1)
 
-        # Ensure all fields are non-null with default values
+        # Elevation-dependent fields are filled in by _apply_elevation once every
+        # candidate is known, so the elevation lookups can be batched across trails;
+        # text and geometry fields are built by _finalize_trail for the kept trails.
+        # Per-vertex data is held as packed double columns (8 bytes per value)
+        # rather than a list of float tuples, since most candidates are dropped.
         all_trails.append(
             {
                 "trail_id": trail_id or f"trail_{len(all_trails)}",
                 "name": name or "Unnamed Trail",
-                "description": description or f"Hiking trail in {region_name}",
-                "difficulty": float(difficulty) if difficulty is not None else 5.0,
                 "distance": round(float(total_distance_km), 2) if total_distance_km is not None else 5.0,
-                "duration": int(duration) if duration is not None else 120,
-                "elevation_gain": int(elevation_gain) if elevation_gain is not None else 0,
-                "elevation_profile": elevation_profile if elevation_profile is not None else [],
                 "trail_type": trail_type or "one_way",
-                "landscapes": landscapes or "alpine",
-                "popularity": float(popularity) if popularity is not None else 6.0,
-                "safety_risks": safety or "low",
-                "accessibility": accessibility or "",
-                "closed_seasons": "",
                 "latitude": float(centroid_lat) if centroid_lat is not None else 0.0,
                 "longitude": float(centroid_lon) if centroid_lon is not None else 0.0,
-                "coordinates": _build_geojson(coords_wgs84) if coords_wgs84 else json.dumps({"type": "LineString", "coordinates": []}),
                 "region": region_name or "unknown",
-                "source": "french_osm_shapefile",
-                "is_real": 1,
+                "_lons": array("d", lons),
+                "_lats": array("d", lats),
+                "_props": props,
+                "_region_description": matching_region["description"],
+                "_distance_km": total_distance_km,
+                "_cumulative_km": array("d", cumulative),
+                "_raw_difficulty": raw_difficulty,
+                "_raw_difficulty_value": raw_difficulty_value,
             }
         )
         region_counts[region_name] += 1
+        if limit_per_region and region_counts[region_name] >= limit_per_region:
+            open_regions.remove(matching_region)
+
+    # The cumulative distances are sampled at the same vertices as the coordinates,
+    # so the profile reuses the full-resolution haversine pass instead of re-measuring
+    sampled_per_trail: List[List[Tuple[float, float]]] = []
+    distances_per_trail: List[List[float]] = []
+    for trail in all_trails:
+        lons, lats, cumulative = trail["_lons"], trail["_lats"], trail["_cumulative_km"]
+        indices = _sample_indices(len(lons), MAX_ELEVATION_SAMPLES)
+        sampled_per_trail.append([(lons[i], lats[i]) for i in indices])
+        distances_per_trail.append([cumulative[i] for i in indices])
+    elevation_cache = _open_elevation_cache(ELEVATION_CACHE_DB)
+    try:
+        elevations = _fetch_elevation_profiles(sampled_per_trail, distances_per_trail, cache=elevation_cache)
+    finally:
+        if elevation_cache is not None:
+            elevation_cache.close()
+    for trail, elevation in zip(all_trails, elevations):
+        if isinstance(elevation, Exception):
+            print(f"[WARN] Elevation profile failed for {trail['name']}: {elevation}")
+            _apply_elevation(trail, [], int(trail["_distance_km"] * 75))
+        else:
+            _apply_elevation(trail, *elevation)
 
     # Apply diversity selection if we have a total_limit
     # This ensures we get trails across different duration and difficulty ranges
@@ -644,37 +1015,23 @@ def load_french_trails(
         print(f"Selecting {total_limit} diverse trails from {len(all_trails)} candidates...")
         all_trails = _select_diverse_trails(all_trails, total_limit, min_per_category=1)
         print(f"Selected {len(all_trails)} diverse trails")
+        region_counts = Counter(trail["region"] for trail in all_trails)
         
         # Print diversity summary
-        duration_counts = {}
-        difficulty_counts = {}
-        for trail in all_trails:
-            dur = trail.get("duration", 120)
-            diff = trail.get("difficulty", 5.0)
-            if dur < 120:
-                duration_counts["< 2h"] = duration_counts.get("< 2h", 0) + 1
-            elif dur < 240:
-                duration_counts["2-4h"] = duration_counts.get("2-4h", 0) + 1
-            elif dur < 480:
-                duration_counts["4-8h"] = duration_counts.get("4-8h", 0) + 1
-            elif dur < 720:
-                duration_counts["8-12h"] = duration_counts.get("8-12h", 0) + 1
-            elif dur < 1440:
-                duration_counts["12-24h"] = duration_counts.get("12-24h", 0) + 1
-            else:
-                duration_counts["> 24h"] = duration_counts.get("> 24h", 0) + 1
-            
-            if diff < 4.0:
-                difficulty_counts["Easy"] = difficulty_counts.get("Easy", 0) + 1
-            elif diff < 7.0:
-                difficulty_counts["Medium"] = difficulty_counts.get("Medium", 0) + 1
-            else:
-                difficulty_counts["Hard"] = difficulty_counts.get("Hard", 0) + 1
+        duration_counts = Counter(
+            DURATION_CATEGORY_LABELS[bisect_right(DURATION_CATEGORY_EDGES, trail.get("duration", 120))]
+            for trail in all_trails
+        )
+        difficulty_counts = Counter(
+            DIFFICULTY_CATEGORY_LABELS[bisect_right(DIFFICULTY_CATEGORY_EDGES, trail.get("difficulty", 5.0))]
+            for trail in all_trails
+        )
         
-        print("Duration diversity:", duration_counts)
-        print("Difficulty diversity:", difficulty_counts)
+        print("Duration diversity:", dict(duration_counts))
+        print("Difficulty diversity:", dict(difficulty_counts))
     
-    return all_trails
+    region_counts = {region: count for region, count in region_counts.items() if count}
+    return [_finalize_trail(trail) for trail in all_trails], region_counts
 
 
 # Backward compatibility alias
@@ -685,79 +1042,75 @@ def load_french_alps_trails(
     limit: int | None = None,
 ) -> List[Dict]:
     """Backward compatibility: Load only French Alps trails."""
-    return load_french_trails(
+    trails, _ = load_french_trails(
         shapefile_path=shapefile_path,
         bbox=bbox,
         total_limit=limit
     )
+    return trails
 
 
 def save_trails_to_json(trails: Sequence[Dict], output_path: Path = DEFAULT_OUTPUT) -> Path:
+    """
+    Write the trails as a JSON array with one trail per line.
+
+    ``indent`` would force the pure-Python encoder for the whole payload, so
+    each trail is encoded on its own by a C encoder instead; the file stays
+    diff-friendly and loads with a plain ``json.load``.
+    """
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(trails, indent=2), encoding="utf-8")
+    body = ",\n".join(_json_dumps(trail) for trail in trails)
+    output_path.write_text(f"[\n{body}\n]\n" if body else "[]\n", encoding="utf-8")
     return output_path
 
 
+def _trail_db_row(trail: Dict) -> Tuple:
+    """Flatten a trail dict into a tuple ordered like ``TRAIL_DB_COLUMNS``."""
+    row = [trail.get(column) for column in TRAIL_DB_COLUMNS]
+    row[-1] = _json_dumps(trail.get("elevation_profile", []))
+    return tuple(row)
+
+
 def write_trails_to_db(trails: Sequence[Dict], db_path: Path = TRAILS_DB) -> None:
     if not trails:
         print("No trails to persist.")
         return
     conn = sqlite3.connect(db_path)
+    # Bulk-load settings for this connection only: keep temporary b-trees in
+    # memory and give the page cache ~200 MB. This writes the live database
+    # the web app reads, so synchronous stays at NORMAL (not OFF) and a crash
+    # mid-load cannot corrupt it; the single transaction keeps fsyncs few.
+    # journal_mode is left alone because it is persisted in the database
+    # file that the web app also opens.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
     cur = conn.cursor()
-    columns = [
-        "trail_id",
-        "name",
-        "difficulty",
-        "distance",
-        "duration",
-        "elevation_gain",
-        "trail_type",
-        "landscapes",
-        "popularity",
-        "safety_risks",
-        "accessibility",
-        "closed_seasons",
-        "description",
-        "latitude",
-        "longitude",
-        "coordinates",
-        "region",
-        "source",
-        "is_real",
-        "elevation_profile",
-    ]
-    placeholders = ",".join("?" for _ in columns)
-    for trail in trails:
-        cur.execute(
+    placeholders = ",".join("?" for _ in TRAIL_DB_COLUMNS)
+    try:
+        cur.execute("BEGIN")
+        # Secondary indexes are rebuilt once after the load instead of being
+        # updated row by row; the primary key autoindex (sql IS NULL) stays.
+        index_sql = cur.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'trails' AND sql IS NOT NULL"
+        ).fetchall()
+        for name, _ in index_sql:
+            cur.execute(f'DROP INDEX "{name}"')
+        cur.executemany(
             f"""
-            INSERT OR REPLACE INTO trails ({','.join(columns)})
+            INSERT OR REPLACE INTO trails ({','.join(TRAIL_DB_COLUMNS)})
             VALUES ({placeholders})
             """,
-            [
-                trail.get("trail_id"),
-                trail.get("name"),
-                trail.get("difficulty"),
-                trail.get("distance"),
-                trail.get("duration"),
-                trail.get("elevation_gain"),
-                trail.get("trail_type"),
-                trail.get("landscapes"),
-                trail.get("popularity"),
-                trail.get("safety_risks"),
-                trail.get("accessibility"),
-                trail.get("closed_seasons"),
-                trail.get("description"),
-                trail.get("latitude"),
-                trail.get("longitude"),
-                trail.get("coordinates"),
-                trail.get("region"),
-                trail.get("source"),
-                trail.get("is_real"),
-                json.dumps(trail.get("elevation_profile", [])),
-            ],
+            map(_trail_db_row, trails),
         )
-    conn.commit()
-    conn.close()
+        for _, sql in index_sql:
+            cur.execute(sql)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 def _parse_args() -> argparse.Namespace:
@@ -796,13 +1149,13 @@ def main() -> None:
     if args.bbox:
         # Backward compatibility: single bbox
         bbox = tuple(args.bbox)
-        trails = load_french_trails(bbox=bbox, total_limit=args.limit)
+        trails, region_counts = load_french_trails(bbox=bbox, total_limit=args.limit)
     elif args.regions:
         # Load specified regions
-        trails = load_french_trails(regions=args.regions, total_limit=args.limit)
+        trails, region_counts = load_french_trails(regions=args.regions, total_limit=args.limit)
     else:
         # Load all regions by default
-        trails = load_french_trails(regions=None, total_limit=args.limit)
+        trails, region_counts = load_french_trails(regions=None, total_limit=args.limit)
     
     if not trails:
         print("No matching trails found. Check the bounding box or shapefile path.")
@@ -812,10 +1165,6 @@ def main() -> None:
     print(f"Saved {len(trails)} real trails to {output_path}")
     
     # Print region breakdown
-    region_counts: Dict[str, int] = {}
-    for trail in trails:
-        region = trail.get("region", "unknown")
-        region_counts[region] = region_counts.get(region, 0) + 1
     print("Region breakdown:")
     for region, count in sorted(region_counts.items()):
         print(f"  {region}: {count} trails")
@@ -2,43 +2,77 @@
 """
 Configuration for recommendation system.
 Configurable thresholds and settings for flexibility.
+
+Environment variables are read once at import into the immutable ``CONFIG``
+object; the module-level names below are kept as aliases of its fields.
 """
 
 import os
+from dataclasses import dataclass
+from typing import Tuple
 
-# Exact match threshold - minimum relevance percentage for exact matches
-EXACT_MATCH_THRESHOLD = float(os.getenv("REC_EXACT_MATCH_THRESHOLD", "80.0"))
-
-# Progressive threshold levels for fallback
-THRESHOLD_LEVELS = [
-    80.0,  # Level 1: Strict
-    60.0,  # Level 2: Moderate
-    40.0,  # Level 3: Lenient
-    20.0   # Level 4: Very lenient
-]
-
-# Minimum candidates before triggering fallback
-MIN_CANDIDATES_BEFORE_FALLBACK = int(os.getenv("REC_MIN_CANDIDATES", "0"))
-
-# Maximum filter relaxation levels to try
-MAX_FILTER_RELAXATION_LEVELS = int(os.getenv("REC_MAX_FALLBACK_LEVELS", "7"))
 
-# Enable debug mode (set via environment variable)
-DEBUG_ENABLED = os.getenv("REC_DEBUG", "true").lower() == "true"
+@dataclass(frozen=True, slots=True)
+class RecConfig:
+    """Recommendation settings, resolved once from the environment."""
+    exact_match_threshold: float
+    threshold_levels: Tuple[float, ...]
+    min_candidates_before_fallback: int
+    max_filter_relaxation_levels: int
+    debug_enabled: bool
+    soft_filter_mode: bool
+    always_return_results: bool
+    min_results_to_return: int
+    default_max_trails: int
+    default_max_exact: int
+    default_max_suggestions: int
+    default_max_collaborative: int
 
-# Soft filter mode - deprioritize instead of removing
-SOFT_FILTER_MODE = os.getenv("REC_SOFT_FILTER", "false").lower() == "true"
 
-# Always return results (even if low quality)
-ALWAYS_RETURN_RESULTS = os.getenv("REC_ALWAYS_RETURN", "true").lower() == "true"
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
 
-# Minimum results to return
-MIN_RESULTS_TO_RETURN = int(os.getenv("REC_MIN_RESULTS", "1"))
 
-# Maximum results per category
-DEFAULT_MAX_TRAILS = int(os.getenv("REC_MAX_TRAILS", "10"))
+CONFIG = RecConfig(
+    # Exact match threshold - minimum relevance percentage for exact matches
+    exact_match_threshold=float(os.getenv("REC_EXACT_MATCH_THRESHOLD", "80.0")),
+    # Progressive threshold levels for fallback
+    threshold_levels=(
+        80.0,  # Level 1: Strict
+        60.0,  # Level 2: Moderate
+        40.0,  # Level 3: Lenient
+        20.0   # Level 4: Very lenient
+    ),
+    # Minimum candidates before triggering fallback
+    min_candidates_before_fallback=int(os.getenv("REC_MIN_CANDIDATES", "0")),
+    # Maximum filter relaxation levels to try
+    max_filter_relaxation_levels=int(os.getenv("REC_MAX_FALLBACK_LEVELS", "7")),
+    # Enable debug mode (set via environment variable)
+    debug_enabled=_env_flag("REC_DEBUG", "true"),
+    # Soft filter mode - deprioritize instead of removing
+    soft_filter_mode=_env_flag("REC_SOFT_FILTER", "false"),
+    # Always return results (even if low quality)
+    always_return_results=_env_flag("REC_ALWAYS_RETURN", "true"),
+    # Minimum results to return
+    min_results_to_return=int(os.getenv("REC_MIN_RESULTS", "1")),
+    # Maximum results per category
+    default_max_trails=int(os.getenv("REC_MAX_TRAILS", "10")),
+    # Maximum results per category (can be overridden)
+    default_max_exact=int(os.getenv("REC_MAX_EXACT", "30")),
+    default_max_suggestions=int(os.getenv("REC_MAX_SUGGESTIONS", "20")),
+    default_max_collaborative=int(os.getenv("REC_MAX_COLLABORATIVE", "10")),
+)
 
-# Maximum results per category (can be overridden)
-DEFAULT_MAX_EXACT = int(os.getenv("REC_MAX_EXACT", "30"))
-DEFAULT_MAX_SUGGESTIONS = int(os.getenv("REC_MAX_SUGGESTIONS", "20"))
-DEFAULT_MAX_COLLABORATIVE = int(os.getenv("REC_MAX_COLLABORATIVE", "10"))
+# Legacy module-level names
+EXACT_MATCH_THRESHOLD = CONFIG.exact_match_threshold
+THRESHOLD_LEVELS = CONFIG.threshold_levels
+MIN_CANDIDATES_BEFORE_FALLBACK = CONFIG.min_candidates_before_fallback
+MAX_FILTER_RELAXATION_LEVELS = CONFIG.max_filter_relaxation_levels
+DEBUG_ENABLED = CONFIG.debug_enabled
+SOFT_FILTER_MODE = CONFIG.soft_filter_mode
+ALWAYS_RETURN_RESULTS = CONFIG.always_return_results
+MIN_RESULTS_TO_RETURN = CONFIG.min_results_to_return
+DEFAULT_MAX_TRAILS = CONFIG.default_max_trails
+DEFAULT_MAX_EXACT = CONFIG.default_max_exact
+DEFAULT_MAX_SUGGESTIONS = CONFIG.default_max_suggestions
+DEFAULT_MAX_COLLABORATIVE = CONFIG.default_max_collaborative
@@ -4,16 +4,189 @@ Context builder for explanation generation.
 Extensible design for preparing context data for OpenAI prompts.
 """
 
-from typing import Dict, List, Optional
+from dataclasses import asdict, dataclass, field
+from collections import Counter
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Dict, List, Optional, Tuple
 from backend.user_profiling import UserProfiler
 
+# Only the display names are needed, so no UserProfiler instance is created
+PROFILE_NAMES = UserProfiler.PROFILE_NAMES
+
+
+@dataclass(slots=True)
+class UserContext:
+    """User profile part of an explanation context."""
+    name: str = "User"
+    experience: str = "Unknown"
+    fitness_level: str = "Unknown"
+    detected_profile: Optional[str] = None
+    preferences: List[str] = field(default_factory=list)
+    fear_of_heights: Any = 0
+    health_constraints: Optional[str] = None
+    trails_completed: int = 0
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class SearchContext:
+    """Search parameters part of an explanation context."""
+    time_available: str = "Not specified"
+    device: str = "Unknown"
+    weather: str = "Unknown"
+    season: str = "Unknown"
+    connection: str = "Unknown"
+    hike_date: Optional[str] = None
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class TrailContext:
+    """Trail details part of a per-trail explanation context."""
+    name: str = "Unknown Trail"
+    difficulty: float = 0
+    distance: float = 0
+    duration: float = 0
+    elevation_gain: float = 0
+    landscapes: List[str] = field(default_factory=list)
+    trail_type: str = "Unknown"
+    safety_risks: str = "none"
+    forecast_weather: Optional[str] = None
+    relevance_percentage: float = 0
+    popularity: float = 0
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def split_landscapes(landscapes: Optional[str]) -> List[str]:
+    """Split a comma-separated landscapes field into stripped, non-empty names."""
+    if not landscapes:
+        return []
+    return list(_split_landscapes(landscapes))
+
+
+@lru_cache(maxsize=1024)
+def _split_landscapes(landscapes: str) -> Tuple[str, ...]:
+    """Cached worker of split_landscapes: trails share few distinct landscapes values."""
+    return tuple(l for l in (l.strip() for l in landscapes.split(",")) if l)
+
+
+def _trail_landscapes(trail: Dict) -> List[str]:
+    """Landscape names of a trail (the split is cached per distinct landscapes value)."""
+    return split_landscapes(trail.get("landscapes"))
+
+
+@lru_cache(maxsize=512, typed=True)
+def _format_time(minutes: int) -> str:
+    """Format an available time in minutes as "X days and Y hours"."""
+    if not minutes:
+        return "Not specified"
+    days = minutes // (24 * 60)
+    hours = (minutes % (24 * 60)) // 60
+    
+    time_str = ""
+    if days > 0:
+        time_str = f"{days} day{'s' if days != 1 else ''}"
+    if hours > 0:
+        if days > 0:
+            time_str += f" and {hours} hour{'s' if hours != 1 else ''}"
+        else:
+            time_str = f"{hours} hour{'s' if hours != 1 else ''}"
+    return time_str or "Not specified"
+
+
+def _bullets(items: List[Dict], field: str, fallback_field: str, limit: int = 5) -> str:
+    """Format the first ``limit`` items as "- text" lines for a prompt."""
+    return "\n".join([
+        f"- {item.get(field, item.get(fallback_field, ''))}"
+        for item in islice(items, limit)
+    ])
+
+
+class _LazyTrailSummary(Mapping):
+    """
+    Read-only trail summary whose statistics are computed on first access.
+    
+    The counts are known up front; the averages and common landscapes need a
+    pass over every trail, so that pass only runs (once, for all of them)
+    when one of those keys is actually read.
+    """
+    
+    STAT_KEYS = (
+        "avg_difficulty", "avg_distance", "avg_duration", "avg_elevation", "common_landscapes"
+    )
+    
+    __slots__ = ("_exact_matches", "_suggestions", "_counts", "_stats")
+    
+    def __init__(self, exact_matches: List[Dict], suggestions: List[Dict]):
+        self._exact_matches = exact_matches
+        self._suggestions = suggestions
+        self._counts = {
+            "total_count": len(exact_matches) + len(suggestions),
+            "exact_matches_count": len(exact_matches),
+            "suggestions_count": len(suggestions)
+        }
+        # No trails: the summary only has the counts
+        self._stats = None if self._counts["total_count"] else {}
+    
+    def __getitem__(self, key: str):
+        if key in self._counts:
+            return self._counts[key]
+        if self._stats is None:
+            self._stats = self._compute_stats()
+        return self._stats[key]
+    
+    def __iter__(self):
+        yield from self._counts
+        if self._counts["total_count"]:
+            yield from self.STAT_KEYS
+    
+    def __len__(self) -> int:
+        return len(self._counts) + (len(self.STAT_KEYS) if self._counts["total_count"] else 0)
+    
+    def _compute_stats(self) -> Dict:
+        # One pass over all trails (missing/zero values are not averaged)
+        difficulty_sum = distance_sum = duration_sum = elevation_sum = 0
+        difficulty_count = distance_count = duration_count = elevation_count = 0
+        landscape_counts = Counter()
+        for trail in chain(self._exact_matches, self._suggestions):
+            difficulty = trail.get("difficulty")
+            if difficulty:
+                difficulty_sum += difficulty
+                difficulty_count += 1
+            distance = trail.get("distance")
+            if distance:
+                distance_sum += distance
+                distance_count += 1
+            duration = trail.get("duration")
+            if duration:
+                duration_sum += duration
+                duration_count += 1
+            elevation = trail.get("elevation_gain")
+            if elevation:
+                elevation_sum += elevation
+                elevation_count += 1
+            landscape_counts.update(_trail_landscapes(trail))
+        
+        return {
+            "avg_difficulty": difficulty_sum / difficulty_count if difficulty_count else 0,
+            "avg_distance": distance_sum / distance_count if distance_count else 0,
+            "avg_duration": duration_sum / duration_count if duration_count else 0,
+            "avg_elevation": elevation_sum / elevation_count if elevation_count else 0,
+            "common_landscapes": [l for l, _ in landscape_counts.most_common(5)]  # Top 5 by frequency
+        }
+
 
 class ContextBuilder:
     """Builds context data for explanation generation with extensible design."""
     
-    def __init__(self):
-        self.profiler = UserProfiler()
-    
     def build_general_context(
         self,
         user: Dict,
@@ -80,46 +253,32 @@ class ContextBuilder:
         """Add user profile information to context."""
         profile_name = None
         if user.get("detected_profile"):
-            profile_name = self.profiler.PROFILE_NAMES.get(
+            profile_name = PROFILE_NAMES.get(
                 user["detected_profile"],
                 user["detected_profile"]
             )
         
-        context_dict["user"] = {
-            "name": user.get("name", "User"),
-            "experience": user.get("experience", "Unknown"),
-            "fitness_level": user.get("fitness_level", "Unknown"),
-            "detected_profile": profile_name,
-            "preferences": user.get("preferences", []),
-            "fear_of_heights": user.get("fear_of_heights", 0),
-            "health_constraints": user.get("health_constraints"),
-            "trails_completed": len(user.get("completed_trails", []))
-        }
+        context_dict["user"] = UserContext(
+            name=user.get("name", "User"),
+            experience=user.get("experience", "Unknown"),
+            fitness_level=user.get("fitness_level", "Unknown"),
+            detected_profile=profile_name,
+            preferences=user.get("preferences", []),
+            fear_of_heights=user.get("fear_of_heights", 0),
+            health_constraints=user.get("health_constraints"),
+            trails_completed=len(user.get("completed_trails", []))
+        )
     
     def _add_search_context(self, context_dict: Dict, context: Dict) -> None:
         """Add search context parameters."""
-        # Format time available
-        time_available = context.get("time_available", 0)
-        days = time_available // (24 * 60)
-        hours = (time_available % (24 * 60)) // 60
-        
-        time_str = ""
-        if days > 0:
-            time_str = f"{days} day{'s' if days != 1 else ''}"
-        if hours > 0:
-            if days > 0:
-                time_str += f" and {hours} hour{'s' if hours != 1 else ''}"
-            else:
-                time_str = f"{hours} hour{'s' if hours != 1 else ''}"
-        
-        context_dict["search_context"] = {
-            "time_available": time_str or "Not specified",
-            "device": context.get("device", "Unknown"),
-            "weather": context.get("weather", "Unknown"),
-            "season": context.get("season", "Unknown"),
-            "connection": context.get("connection", "Unknown"),
-            "hike_date": context.get("hike_start_date") or context.get("hike_date")
-        }
+        context_dict["search_context"] = SearchContext(
+            time_available=_format_time(context.get("time_available", 0) or 0),
+            device=context.get("device", "Unknown"),
+            weather=context.get("weather", "Unknown"),
+            season=context.get("season", "Unknown"),
+            connection=context.get("connection", "Unknown"),
+            hike_date=context.get("hike_start_date") or context.get("hike_date")
+        )
     
     def _add_trail_summary(
         self,
@@ -127,40 +286,8 @@ class ContextBuilder:
         exact_matches: List[Dict],
         suggestions: List[Dict]
     ) -> None:
-        """Add summary statistics about recommended trails."""
-        all_trails = exact_matches + suggestions
-        
-        if not all_trails:
-            context_dict["trail_summary"] = {
-                "total_count": 0,
-                "exact_matches_count": 0,
-                "suggestions_count": 0
-            }
-            return
-        
-        # Calculate statistics
-        difficulties = [t.get("difficulty", 0) for t in all_trails if t.get("difficulty")]
-        distances = [t.get("distance", 0) for t in all_trails if t.get("distance")]
-        durations = [t.get("duration", 0) for t in all_trails if t.get("duration")]
-        elevations = [t.get("elevation_gain", 0) for t in all_trails if t.get("elevation_gain")]
-        
-        # Collect landscapes
-        all_landscapes = []
-        for trail in all_trails:
-            landscapes = trail.get("landscapes", "")
-            if landscapes:
-                all_landscapes.extend([l.strip() for l in landscapes.split(",")])
-        
-        context_dict["trail_summary"] = {
-            "total_count": len(all_trails),
-            "exact_matches_count": len(exact_matches),
-            "suggestions_count": len(suggestions),
-            "avg_difficulty": sum(difficulties) / len(difficulties) if difficulties else 0,
-            "avg_distance": sum(distances) / len(distances) if distances else 0,
-            "avg_duration": sum(durations) / len(durations) if durations else 0,
-            "avg_elevation": sum(elevations) / len(elevations) if elevations else 0,
-            "common_landscapes": list(set(all_landscapes))[:5]  # Top 5 unique landscapes
-        }
+        """Add summary statistics about recommended trails (computed on first access)."""
+        context_dict["trail_summary"] = _LazyTrailSummary(exact_matches, suggestions)
     
     def _add_matching_rules(self, context_dict: Dict, active_rules: List[Dict]) -> None:
         """Add active matching rules."""
@@ -174,23 +301,21 @@ class ContextBuilder:
     
     def _add_trail_details(self, context_dict: Dict, trail: Dict) -> None:
         """Add specific trail details."""
-        landscapes = []
-        if trail.get("landscapes"):
-            landscapes = [l.strip() for l in trail["landscapes"].split(",")]
+        landscapes = _trail_landscapes(trail)
         
-        context_dict["trail_details"] = {
-            "name": trail.get("name", "Unknown Trail"),
-            "difficulty": trail.get("difficulty", 0),
-            "distance": trail.get("distance", 0),
-            "duration": trail.get("duration", 0),
-            "elevation_gain": trail.get("elevation_gain", 0),
-            "landscapes": landscapes,
-            "trail_type": trail.get("trail_type", "Unknown"),
-            "safety_risks": trail.get("safety_risks", "none"),
-            "forecast_weather": trail.get("forecast_weather"),
-            "relevance_percentage": trail.get("relevance_percentage", 0),
-            "popularity": trail.get("popularity", 0)
-        }
+        context_dict["trail_details"] = TrailContext(
+            name=trail.get("name", "Unknown Trail"),
+            difficulty=trail.get("difficulty", 0),
+            distance=trail.get("distance", 0),
+            duration=trail.get("duration", 0),
+            elevation_gain=trail.get("elevation_gain", 0),
+            landscapes=landscapes,
+            trail_type=trail.get("trail_type", "Unknown"),
+            safety_risks=trail.get("safety_risks", "none"),
+            forecast_weather=trail.get("forecast_weather"),
+            relevance_percentage=trail.get("relevance_percentage", 0),
+            popularity=trail.get("popularity", 0)
+        )
     
     def _add_criteria_analysis(
         self,
@@ -234,27 +359,27 @@ class ContextBuilder:
     
     def _build_general_prompt(self, context_dict: Dict) -> str:
         """Build prompt for general explanation."""
-        user = context_dict.get("user", {})
-        search = context_dict.get("search_context", {})
+        user = context_dict.get("user") or UserContext()
+        search = context_dict.get("search_context") or SearchContext()
         summary = context_dict.get("trail_summary", {})
         rules = context_dict.get("matching_rules", [])
         
         prompt = f"""Generate a personalized explanation for trail recommendations.
 
 User Profile:
-- Name: {user.get('name', 'User')}
-- Experience: {user.get('experience', 'Unknown')}
-- Fitness Level: {user.get('fitness_level', 'Unknown')}
-- Detected Profile: {user.get('detected_profile', 'Not detected')}
-- Preferences: {', '.join(user.get('preferences', [])) or 'None'}
-- Trails Completed: {user.get('trails_completed', 0)}
+- Name: {user.name}
+- Experience: {user.experience}
+- Fitness Level: {user.fitness_level}
+- Detected Profile: {user.detected_profile}
+- Preferences: {', '.join(user.preferences) or 'None'}
+- Trails Completed: {user.trails_completed}
 
 Search Context:
-- Time Available: {search.get('time_available', 'Not specified')}
-- Device: {search.get('device', 'Unknown')}
-- Desired Weather: {search.get('weather', 'Unknown')}
-- Season: {search.get('season', 'Unknown')}
-- Hike Date: {search.get('hike_date', 'Not specified')}
+- Time Available: {search.time_available}
+- Device: {search.device}
+- Desired Weather: {search.weather}
+- Season: {search.season}
+- Hike Date: {search.hike_date}
 
 Trail Summary:
 - Total Recommendations: {summary.get('total_count', 0)} ({summary.get('exact_matches_count', 0)} exact matches, {summary.get('suggestions_count', 0)} suggestions)
@@ -265,7 +390,7 @@ Trail Summary:
 - Common Landscapes: {', '.join(summary.get('common_landscapes', [])) or 'Various'}
 
 Active Matching Rules:
-{chr(10).join([f"- {r.get('description', r.get('condition', ''))}" for r in rules[:5]])}
+{_bullets(rules, 'description', 'condition')}
 
 Generate a brief, friendly explanation (2-3 sentences) explaining why these trails were recommended for this user, and provide 3-5 key matching factors as bullet points."""
         
@@ -273,44 +398,29 @@ Generate a brief, friendly explanation (2-3 sentences) explaining why these trai
     
     def _build_trail_prompt(self, context_dict: Dict) -> str:
         """Build prompt for per-trail explanation."""
-        user = context_dict.get("user", {})
-        search = context_dict.get("search_context", {})
-        trail = context_dict.get("trail_details", {})
-        criteria = context_dict.get("criteria", {})
-        
-        matched = criteria.get("matched", [])
-        unmatched = criteria.get("unmatched", [])
+        user = context_dict.get("user") or UserContext()
+        search = context_dict.get("search_context") or SearchContext()
+        trail_block = self._format_trail_block(
+            context_dict.get("trail_details") or TrailContext(),
+            context_dict.get("criteria", {})
+        )
         
         prompt = f"""Generate a personalized explanation for why a specific trail was recommended.
 
 User Profile:
-- Name: {user.get('name', 'User')}
-- Experience: {user.get('experience', 'Unknown')}
-- Fitness Level: {user.get('fitness_level', 'Unknown')}
-- Detected Profile: {user.get('detected_profile', 'Not detected')}
-- Preferences: {', '.join(user.get('preferences', [])) or 'None'}
+- Name: {user.name}
+- Experience: {user.experience}
+- Fitness Level: {user.fitness_level}
+- Detected Profile: {user.detected_profile}
+- Preferences: {', '.join(user.preferences) or 'None'}
 
 Search Context:
-- Time Available: {search.get('time_available', 'Not specified')}
-- Desired Weather: {search.get('weather', 'Unknown')}
-- Season: {search.get('season', 'Unknown')}
+- Time Available: {search.time_available}
+- Desired Weather: {search.weather}
+- Season: {search.season}
 
 Trail Details:
-- Name: {trail.get('name', 'Unknown Trail')}
-- Difficulty: {trail.get('difficulty', 0):.1f}/10
-- Distance: {trail.get('distance', 0):.1f} km
-- Duration: {trail.get('duration', 0):.0f} minutes ({trail.get('duration', 0) / 60:.1f} hours)
-- Elevation Gain: {trail.get('elevation_gain', 0):.0f} m
-- Landscapes: {', '.join(trail.get('landscapes', [])) or 'Various'}
-- Trail Type: {trail.get('trail_type', 'Unknown')}
-- Forecast Weather: {trail.get('forecast_weather', 'Not available')}
-- Relevance: {trail.get('relevance_percentage', 0):.0f}%
-
-Matched Criteria (what fits):
-{chr(10).join([f"- {c.get('message', c.get('name', ''))}" for c in matched[:5]]) if matched else 'None'}
-
-Unmatched Criteria (what doesn't fit):
-{chr(10).join([f"- {c.get('message', c.get('name', ''))}" for c in unmatched[:5]]) if unmatched else 'None'}
+{trail_block}
 
 IMPORTANT: Generate a brief, friendly explanation (2-3 sentences) that:
 1. Explains why this trail was recommended (mention what fits)
@@ -320,3 +430,25 @@ IMPORTANT: Generate a brief, friendly explanation (2-3 sentences) that:
 Be transparent and helpful - if the trail is too long/difficult for a beginner, mention that. If the weather doesn't match, mention that too."""
         
         return prompt
+    
+    def _format_trail_block(self, trail: "TrailContext", criteria: Dict) -> str:
+        """Format the trail details and criteria analysis of the trail prompt."""
+        matched = criteria.get("matched", [])
+        unmatched = criteria.get("unmatched", [])
+        duration = trail.duration or 0
+        
+        return f"""- Name: {trail.name}
+- Difficulty: {trail.difficulty:.1f}/10
+- Distance: {trail.distance:.1f} km
+- Duration: {duration:.0f} minutes ({duration / 60:.1f} hours)
+- Elevation Gain: {trail.elevation_gain:.0f} m
+- Landscapes: {', '.join(trail.landscapes) or 'Various'}
+- Trail Type: {trail.trail_type}
+- Forecast Weather: {trail.forecast_weather}
+- Relevance: {trail.relevance_percentage:.0f}%
+
+Matched Criteria (what fits):
+{_bullets(matched, 'message', 'name') or 'None'}
+
+Unmatched Criteria (what doesn't fit):
+{_bullets(unmatched, 'message', 'name') or 'None'}"""
@@ -4,18 +4,138 @@ Criteria evaluators for trail recommendations.
 Each criterion evaluates a specific aspect of trail-user-context matching.
 """
 
-from typing import Dict, List, Optional, Tuple
+import sys
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from functools import lru_cache
 
+from backend.weather_service import COMPATIBLE_WEATHER
 
-@dataclass
+
+@lru_cache(maxsize=256)
+def normalized(value: str) -> str:
+    """
+    Lowercased, interned form of a categorical value (weather, season, risk level).
+    
+    These fields only take a handful of distinct values, so trails share one
+    cached string per value and comparisons against them hit the identity check.
+    """
+    return sys.intern(value.lower())
+
+
+# Experience tiers shared by the difficulty, duration and distance rules
+TIER_BEGINNER = 0      # beginner experience or low fitness
+TIER_INTERMEDIATE = 1  # intermediate experience or medium fitness
+TIER_ADVANCED = 2      # advanced/expert or high fitness
+
+
+def experience_tier(user: Dict) -> int:
+    """Reduce a user's experience and fitness level to one tier code."""
+    experience = normalized(user.get("experience") or "")
+    fitness = normalized(user.get("fitness_level") or "")
+    if experience == "beginner" or fitness == "low":
+        return TIER_BEGINNER
+    if experience == "intermediate" or fitness == "medium":
+        return TIER_INTERMEDIATE
+    return TIER_ADVANCED
+
+
+# Appropriate difficulty band by tier: (min, max, in-range message, below-min score,
+# below-min message). None leaves that side of the band open.
+DIFFICULTY_BANDS = (
+    (None, 3.0, "Difficulty appropriate ({0:.1f} ≤ {2})", None, None),
+    (3.0, 6.0, "Difficulty appropriate ({0:.1f} in range {1}-{2})", 0.5, "Too easy ({0:.1f} < {1})"),
+    (6.0, None, "Difficulty appropriate ({0:.1f} ≥ {1})", 0.3, "Not challenging enough ({0:.1f} < {1})"),
+)
+
+
+# Appropriate elevation gain (m) by fitness level: (min, max); other levels accept any gain
+ELEVATION_BANDS = {
+    "low": (None, 400),
+    "high": (400, None),
+}
+
+
+@dataclass(slots=True)
+class UserProfile:
+    """User fields read by the criteria, normalized once per recommendation."""
+    fitness: str
+    tier: int
+    persistence: float
+    fear_of_heights: bool
+    preferences: Tuple[str, ...]
+    preferences_lower: Tuple[str, ...]
+    preference_set: FrozenSet[str]
+    difficulty_band: Tuple  # DIFFICULTY_BANDS entry for the tier
+    elevation_band: Tuple[Optional[int], Optional[int]]  # ELEVATION_BANDS entry for the fitness level
+
+
+@dataclass(slots=True)
+class ContextProfile:
+    """Search context fields read by the criteria, normalized once per recommendation."""
+    time_available: Optional[float]
+    weather: str
+    season: str
+    hike_date: Optional[str]
+
+
+def preprocess_user(user: Dict) -> UserProfile:
+    """Build the UserProfile the criteria evaluate against."""
+    preferences = tuple(user.get("preferences") or ())
+    preferences_lower = tuple(pref.lower() for pref in preferences)
+    fitness = normalized(user.get("fitness_level") or "")
+    tier = experience_tier(user)
+    return UserProfile(
+        fitness=fitness,
+        tier=tier,
+        persistence=(user.get("performance") or {}).get("persistence_score", 0.5),
+        fear_of_heights=bool(user.get("fear_of_heights", False)),
+        preferences=preferences,
+        preferences_lower=preferences_lower,
+        preference_set=frozenset(preferences_lower),
+        difficulty_band=DIFFICULTY_BANDS[tier],
+        elevation_band=ELEVATION_BANDS.get(fitness, (None, None)),
+    )
+
+
+@lru_cache(maxsize=1024)
+def token_set(value: str) -> FrozenSet[str]:
+    """Lowercased names of a comma-separated trail field (landscapes, closed_seasons)."""
+    return frozenset(t.strip().lower() for t in value.split(",") if t.strip())
+
+
+def preprocess_context(context: Dict) -> ContextProfile:
+    """Build the ContextProfile the criteria evaluate against."""
+    return ContextProfile(
+        time_available=context.get("time_available", 0),
+        weather=normalized(context.get("weather", "sunny")),
+        season=normalized(context.get("season", "")),
+        hike_date=context.get("hike_start_date") or context.get("hike_date"),
+    )
+
+
+@dataclass(slots=True)
 class CriterionResult:
-    """Result of evaluating a criterion."""
+    """
+    Result of evaluating a criterion.
+    
+    The human-readable message is only formatted when ``message`` is read, so
+    results of trails that are never shown cost no string formatting. The
+    scorer turns the results of described trails into plain
+    matches/score/message/weight dicts before they leave the engine.
+    """
     matches: bool
     score: float  # 0.0 to 1.0
-    message: str  # Human-readable explanation
+    template: str  # Human-readable explanation, a str.format template when args are given
     weight: float = 1.0  # Importance weight for this criterion
+    args: Tuple = ()  # Values substituted into the template
+    
+    @property
+    def message(self) -> str:
+        if not self.args:
+            return self.template
+        return self.template.format(*self.args)
 
 
 class Criterion(ABC):
@@ -24,92 +144,146 @@ class Criterion(ABC):
     def __init__(self, weight: float = 1.0):
         self.weight = weight
     
-    @abstractmethod
     def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
         """Evaluate if trail matches this criterion."""
+        return self.evaluate_profile(trail, preprocess_user(user), preprocess_context(context))
+    
+    @abstractmethod
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        """Evaluate if trail matches this criterion, given preprocessed user and context."""
         pass
     
     @abstractmethod
     def get_name(self) -> str:
         """Get the name of this criterion."""
         pass
+    
+    def prepare(self, user: UserProfile, context: ContextProfile) -> Any:
+        """
+        Precompute what this criterion needs from the user and context alone.
+        
+        The result is passed as ``state`` to evaluate_with_state for every
+        trail of a batch. The default has nothing to precompute.
+        """
+        return None
+    
+    def evaluate_with_state(
+        self, trail: Dict, user: UserProfile, context: ContextProfile, state: Any
+    ) -> CriterionResult:
+        """Evaluate one trail using the state returned by prepare."""
+        return self.evaluate_profile(trail, user, context)
+    
+    def evaluate_batch(
+        self, trails: List[Dict], user: UserProfile, context: ContextProfile
+    ) -> List[Union[CriterionResult, Exception]]:
+        """
+        Evaluate this criterion for every trail of one recommendation request.
+        
+        prepare() runs once for the whole batch. A trail whose evaluation
+        raises gets the exception in its slot, so one bad record does not fail
+        the batch.
+        """
+        results = []
+        append = results.append
+        
+        if type(self).evaluate_with_state is Criterion.evaluate_with_state:
+            # No per-request state: call evaluate_profile directly
+            evaluate = self.evaluate_profile
+            for trail in trails:
+                try:
+                    append(evaluate(trail, user, context))
+                except Exception as e:
+                    append(e)
+            return results
+        
+        try:
+            state = self.prepare(user, context)
+        except Exception as e:
+            return [e] * len(trails)
+        
+        evaluate_with_state = self.evaluate_with_state
+        for trail in trails:
+            try:
+                append(evaluate_with_state(trail, user, context, state))
+            except Exception as e:
+                append(e)
+        return results
+
+
+# Results kept per memoized criterion (see MemoizedCriterion)
+RESULT_CACHE_SIZE = 4096
+
+
+class MemoizedCriterion(Criterion):
+    """
+    Criterion whose result depends only on a few categorical values.
+    
+    evaluate_inputs computes the result from those values alone, and
+    evaluate_profile passes them through an LRU cache shared by all requests,
+    so each combination (e.g. a closed_seasons value and the searched season)
+    is evaluated once.
+    """
+    
+    def __init__(self, weight: float = 1.0):
+        super().__init__(weight)
+        self.evaluate_inputs_cached = lru_cache(maxsize=RESULT_CACHE_SIZE)(self.evaluate_inputs)
+    
+    @abstractmethod
+    def evaluate_inputs(self, *inputs) -> CriterionResult:
+        """Evaluate the criterion from the values evaluate_profile extracted."""
+        pass
 
 
 class DifficultyCriterion(Criterion):
     """Evaluates if trail difficulty matches user experience and fitness."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
         trail_difficulty = trail.get("difficulty", 0)
-        experience = (user.get("experience") or "").lower()
-        fitness = (user.get("fitness_level") or "").lower()
+        min_difficulty, max_difficulty, template, below_score, below_template = user.difficulty_band
+        args = (trail_difficulty, min_difficulty, max_difficulty)
         
-        # Determine appropriate difficulty range
-        if experience == "beginner" or fitness == "low":
-            max_difficulty = 3.0
-            if trail_difficulty <= max_difficulty:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Difficulty appropriate ({trail_difficulty:.1f} ≤ {max_difficulty})"
-                )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too difficult ({trail_difficulty:.1f} > {max_difficulty})"
-                )
-        elif experience == "intermediate" or fitness == "medium":
-            min_difficulty, max_difficulty = 3.0, 6.0
-            if min_difficulty <= trail_difficulty <= max_difficulty:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Difficulty appropriate ({trail_difficulty:.1f} in range {min_difficulty}-{max_difficulty})"
-                )
-            elif trail_difficulty < min_difficulty:
-                return CriterionResult(
-                    matches=False,
-                    score=0.5,
-                    message=f"Too easy ({trail_difficulty:.1f} < {min_difficulty})"
-                )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too difficult ({trail_difficulty:.1f} > {max_difficulty})"
-                )
-        else:  # advanced/expert or high fitness
-            min_difficulty = 6.0
-            if trail_difficulty >= min_difficulty:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Difficulty appropriate ({trail_difficulty:.1f} ≥ {min_difficulty})"
-                )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.3,
-                    message=f"Not challenging enough ({trail_difficulty:.1f} < {min_difficulty})"
-                )
+        if min_difficulty is not None and trail_difficulty < min_difficulty:
+            return CriterionResult(
+                matches=False,
+                score=below_score,
+                template=below_template,
+                args=args
+            )
+        if max_difficulty is not None and trail_difficulty > max_difficulty:
+            return CriterionResult(
+                matches=False,
+                score=0.0,
+                template="Too difficult ({0:.1f} > {2})",
+                args=args
+            )
+        return CriterionResult(
+            matches=True,
+            score=1.0,
+            template=template,
+            args=args
+        )
     
     def get_name(self) -> str:
         return "difficulty"
 
 
+@dataclass(slots=True)
+class DurationWindow:
+    """Duration limits derived from the available time (see DurationCriterion.prepare)."""
+    max_allowed: float
+    target_min: float
+    target_max: float
+    min_threshold: float
+    max_excess: float  # width of the falling ramp between target_max and max_allowed
+
+
 class DurationCriterion(Criterion):
     """Evaluates if trail duration fits available time."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
-        trail_duration = trail.get("duration")
-        time_available = context.get("time_available")
-        
-        if not trail_duration or not time_available:
-            return CriterionResult(
-                matches=True,
-                score=0.5,
-                message="Duration data unavailable"
-            )
+    def prepare(self, user: UserProfile, context: ContextProfile) -> Optional[DurationWindow]:
+        time_available = context.time_available
+        if not time_available:
+            return None
         
         # Calculate max allowed duration with smart buffer
         if time_available < 1440:  # Less than 1 day
@@ -136,34 +310,59 @@ class DurationCriterion(Criterion):
             if target_min < 1080:
                 target_min = 1080
         
+        # Trails shorter than 30% of available time are penalized
+        return DurationWindow(
+            max_allowed, target_min, target_max, time_available * 0.3, max_allowed - target_max
+        )
+    
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_with_state(trail, user, context, self.prepare(user, context))
+    
+    def evaluate_with_state(
+        self, trail: Dict, user: UserProfile, context: ContextProfile, window: Optional[DurationWindow]
+    ) -> CriterionResult:
+        trail_duration = trail.get("duration")
+        
+        if not trail_duration or window is None:
+            return CriterionResult(
+                matches=True,
+                score=0.5,
+                template="Duration data unavailable"
+            )
+        
+        max_allowed = window.max_allowed
+        target_min = window.target_min
+        target_max = window.target_max
+        
         # Check if trail exceeds maximum
         if trail_duration > max_allowed:
             return CriterionResult(
                 matches=False,
                 score=0.0,
-                message=f"Too long ({trail_duration} min > {max_allowed} min)"
+                template="Too long ({0} min > {1} min)",
+                args=(trail_duration, max_allowed)
             )
         
         # Check if trail is too long for beginner/low fitness users regardless of available time
-        experience = (user.get("experience") or "").lower()
-        fitness = (user.get("fitness_level") or "").lower()
-        if (experience == "beginner" or fitness == "low") and trail_duration > 360:  # 6 hours
+        if user.tier == TIER_BEGINNER and trail_duration > 360:  # 6 hours
             # Beginners shouldn't do trails longer than 6 hours even if they have time
             return CriterionResult(
                 matches=False,
                 score=0.0,
-                message=f"Too long for beginner ({trail_duration} min > 360 min / 6 hours recommended max)"
+                template="Too long for beginner ({0} min > 360 min / 6 hours recommended max)",
+                args=(trail_duration,)
             )
         
         # Penalize trails that are too short (less than 30% of available time)
-        min_threshold = time_available * 0.3
+        min_threshold = window.min_threshold
         if trail_duration < min_threshold:
             # Still matches but with low score
             ratio = trail_duration / min_threshold
             return CriterionResult(
                 matches=True,
                 score=0.2 * ratio,  # Very low score for too-short trails
-                message=f"Too short ({trail_duration} min < {min_threshold:.0f} min threshold)"
+                template="Too short ({0} min < {1:.0f} min threshold)",
+                args=(trail_duration, min_threshold)
             )
         
         # Calculate score based on how close to target duration
@@ -172,7 +371,8 @@ class DurationCriterion(Criterion):
             return CriterionResult(
                 matches=True,
                 score=1.0,
-                message=f"Duration matches perfectly ({trail_duration} min within target range)"
+                template="Duration matches perfectly ({0} min within target range)",
+                args=(trail_duration,)
             )
         elif trail_duration < target_min:
             # Below target but above minimum threshold
@@ -182,13 +382,14 @@ class DurationCriterion(Criterion):
             return CriterionResult(
                 matches=True,
                 score=score,
-                message=f"Duration acceptable but shorter than ideal ({trail_duration} min < {target_min:.0f} min target)"
+                template="Duration acceptable but shorter than ideal ({0} min < {1:.0f} min target)",
+                args=(trail_duration, target_min)
             )
         else:  # trail_duration > target_max but <= max_allowed
             # Above target but within max
             # Score decreases as we move away from target_max
             excess = trail_duration - target_max
-            max_excess = max_allowed - target_max
+            max_excess = window.max_excess
             if max_excess > 0:
                 ratio = 1.0 - (excess / max_excess)
                 score = 0.7 + (ratio * 0.3)  # Score between 0.7-1.0
@@ -197,26 +398,55 @@ class DurationCriterion(Criterion):
             return CriterionResult(
                 matches=True,
                 score=score,
-                message=f"Duration acceptable but longer than ideal ({trail_duration} min > {target_max:.0f} min target)"
+                template="Duration acceptable but longer than ideal ({0} min > {1:.0f} min target)",
+                args=(trail_duration, target_max)
             )
     
     def get_name(self) -> str:
         return "duration"
 
 
+# Maximum distance (km) by tier. Beginners should not do long single-day trails
+# regardless of persistence; advanced single-day limits depend on persistence.
+MULTI_DAY_MAX_DISTANCE = (50.0, 100.0, 200.0)
+SINGLE_DAY_MAX_DISTANCE = (10.0, 20.0, None)
+
+
 class DistanceCriterion(Criterion):
     """Evaluates if trail distance is appropriate."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
+    def prepare(self, user: UserProfile, context: ContextProfile) -> Tuple[float, float]:
+        """(multi-day max distance, single-day max distance) for this user, in km."""
+        # Multi-day trails are spread over days, so their limit is much more lenient
+        multi_day_max = MULTI_DAY_MAX_DISTANCE[user.tier]
+        single_day_max = SINGLE_DAY_MAX_DISTANCE[user.tier]
+        if single_day_max is None:
+            # Advanced hikers can handle longer distances, but still consider persistence
+            persistence = user.persistence
+            if persistence < 0.4:
+                single_day_max = 20.0
+            elif persistence < 0.7:
+                single_day_max = 30.0
+            else:
+                single_day_max = 40.0
+        
+        return multi_day_max, single_day_max
+    
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_with_state(trail, user, context, self.prepare(user, context))
+    
+    def evaluate_with_state(
+        self, trail: Dict, user: UserProfile, context: ContextProfile, limits: Tuple[float, float]
+    ) -> CriterionResult:
         trail_distance = trail.get("distance")
         trail_duration = trail.get("duration", 0)
-        time_available = context.get("time_available", 0)
+        time_available = context.time_available
         
         if not trail_distance:
             return CriterionResult(
                 matches=True,
                 score=0.5,
-                message="Distance data unavailable"
+                template="Distance data unavailable"
             )
         
         # For multi-day hikes, relax distance restrictions significantly
@@ -225,92 +455,49 @@ class DistanceCriterion(Criterion):
         is_multi_day_trip = time_available >= 1440
         
         if is_multi_day_trail or is_multi_day_trip:
-            # For multi-day hikes, distance is less important - focus on duration instead
-            # Still check if it's reasonable, but be much more lenient
-            experience = (user.get("experience") or "").lower()
-            fitness = (user.get("fitness_level") or "").lower()
-            
-            if experience == "beginner" or fitness == "low":
-                # Even for beginners, multi-day trails can be longer since they're spread over days
-                max_distance = 50.0  # Much more lenient for multi-day
-            elif experience == "intermediate" or fitness == "medium":
-                max_distance = 100.0  # Very lenient for multi-day
-            else:  # advanced/expert or high fitness
-                max_distance = 200.0  # No practical limit for advanced multi-day hikers
-            
-            if trail_distance <= max_distance:
+            if trail_distance <= limits[0]:
                 return CriterionResult(
                     matches=True,
                     score=1.0,
-                    message=f"Distance appropriate for multi-day hike ({trail_distance:.1f} km)"
+                    template="Distance appropriate for multi-day hike ({0:.1f} km)",
+                    args=(trail_distance,)
                 )
             else:
                 # Still allow but with lower score
                 return CriterionResult(
                     matches=True,
                     score=0.7,
-                    message=f"Long distance for multi-day hike ({trail_distance:.1f} km), but acceptable"
+                    template="Long distance for multi-day hike ({0:.1f} km), but acceptable",
+                    args=(trail_distance,)
                 )
         
-        # For single-day hikes, use original strict distance limits
-        experience = (user.get("experience") or "").lower()
-        fitness = (user.get("fitness_level") or "").lower()
-        persistence = user.get("performance", {}).get("persistence_score", 0.5)
-        
-        # Determine max distance based on experience and fitness FIRST (most important)
-        # Then adjust based on persistence
-        if experience == "beginner" or fitness == "low":
-            # Beginners should not do long trails regardless of persistence
-            max_distance = 10.0  # Strict limit for beginners
-            if trail_distance <= max_distance:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Distance appropriate for beginner ({trail_distance:.1f} km ≤ {max_distance} km)"
-                )
-            else:
-                # Penalize heavily - this is too long for a beginner
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too long for beginner ({trail_distance:.1f} km > {max_distance} km recommended max)"
-                )
-        elif experience == "intermediate" or fitness == "medium":
-            # Intermediate hikers can handle moderate distances
-            max_distance = 20.0
-            if trail_distance <= max_distance:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Distance appropriate ({trail_distance:.1f} km ≤ {max_distance} km)"
-                )
+        max_distance = limits[1]
+        if trail_distance <= max_distance:
+            if user.tier == TIER_BEGINNER:
+                template = "Distance appropriate for beginner ({0:.1f} km ≤ {1} km)"
             else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too long ({trail_distance:.1f} km > {max_distance} km)"
-                )
-        else:  # advanced/expert or high fitness
-            # Advanced hikers can handle longer distances, but still consider persistence
-            if persistence < 0.4:
-                max_distance = 20.0
-            elif persistence < 0.7:
-                max_distance = 30.0
-            else:
-                max_distance = 40.0
-            
-            if trail_distance <= max_distance:
-                return CriterionResult(
-                    matches=True,
-                    score=1.0,
-                    message=f"Distance appropriate ({trail_distance:.1f} km ≤ {max_distance} km)"
-                )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too long ({trail_distance:.1f} km > {max_distance} km)"
-                )
+                template = "Distance appropriate ({0:.1f} km ≤ {1} km)"
+            return CriterionResult(
+                matches=True,
+                score=1.0,
+                template=template,
+                args=(trail_distance, max_distance)
+            )
+        elif user.tier == TIER_BEGINNER:
+            # Penalize heavily - this is too long for a beginner
+            return CriterionResult(
+                matches=False,
+                score=0.0,
+                template="Too long for beginner ({0:.1f} km > {1} km recommended max)",
+                args=(trail_distance, max_distance)
+            )
+        else:
+            return CriterionResult(
+                matches=False,
+                score=0.0,
+                template="Too long ({0:.1f} km > {1} km)",
+                args=(trail_distance, max_distance)
+            )
     
     def get_name(self) -> str:
         return "distance"
@@ -319,177 +506,218 @@ class DistanceCriterion(Criterion):
 class ElevationCriterion(Criterion):
     """Evaluates if trail elevation gain matches fitness level."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
         elevation_gain = trail.get("elevation_gain", 0)
-        fitness = (user.get("fitness_level") or "").lower()
+        min_elevation, max_elevation = user.elevation_band
         
-        if fitness == "low":
-            max_elevation = 400
+        if max_elevation is not None:
             if elevation_gain <= max_elevation:
                 return CriterionResult(
                     matches=True,
                     score=1.0,
-                    message=f"Elevation appropriate ({elevation_gain} m ≤ {max_elevation} m)"
+                    template="Elevation appropriate ({0} m ≤ {1} m)",
+                    args=(elevation_gain, max_elevation)
                 )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Too challenging ({elevation_gain} m > {max_elevation} m)"
-                )
-        elif fitness == "high":
-            min_elevation = 400
+            return CriterionResult(
+                matches=False,
+                score=0.0,
+                template="Too challenging ({0} m > {1} m)",
+                args=(elevation_gain, max_elevation)
+            )
+        if min_elevation is not None:
             if elevation_gain >= min_elevation:
                 return CriterionResult(
                     matches=True,
                     score=1.0,
-                    message=f"Elevation appropriate ({elevation_gain} m ≥ {min_elevation} m)"
-                )
-            else:
-                return CriterionResult(
-                    matches=False,
-                    score=0.3,
-                    message=f"Not challenging enough ({elevation_gain} m < {min_elevation} m)"
+                    template="Elevation appropriate ({0} m ≥ {1} m)",
+                    args=(elevation_gain, min_elevation)
                 )
-        else:  # medium or unknown
             return CriterionResult(
-                matches=True,
-                score=0.8,
-                message=f"Elevation acceptable ({elevation_gain} m)"
+                matches=False,
+                score=0.3,
+                template="Not challenging enough ({0} m < {1} m)",
+                args=(elevation_gain, min_elevation)
             )
+        # medium or unknown
+        return CriterionResult(
+            matches=True,
+            score=0.8,
+            template="Elevation acceptable ({0} m)",
+            args=(elevation_gain,)
+        )
     
     def get_name(self) -> str:
         return "elevation"
 
 
-class SafetyCriterion(Criterion):
+# safety_risks flags, see safety_flags()
+SAFETY_HEIGHTS = 1   # mentions heights exposure
+SAFETY_ELEVATED = 2  # risk level above none/low
+
+# Weather in which any elevated safety risk makes a trail unsafe
+UNSAFE_WEATHER = frozenset({"rainy", "snowy", "storm_risk"})
+
+
+@lru_cache(maxsize=256)
+def safety_flags(safety_risks: str) -> int:
+    """SAFETY_* bitmask of a normalized safety_risks value."""
+    flags = 0
+    if "heights" in safety_risks:
+        flags |= SAFETY_HEIGHTS
+    if safety_risks not in ("", "none", "low"):
+        flags |= SAFETY_ELEVATED
+    return flags
+
+
+class SafetyCriterion(MemoizedCriterion):
     """Evaluates trail safety based on user preferences and weather."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
-        safety_risks = (trail.get("safety_risks") or "").lower()
-        fear_of_heights = user.get("fear_of_heights", False)
-        weather = context.get("weather", "sunny").lower()
-        forecast_weather = trail.get("forecast_weather")
-        effective_weather = forecast_weather or weather
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_inputs_cached(
+            trail.get("safety_risks"),
+            trail.get("forecast_weather") or context.weather,
+            user.fear_of_heights
+        )
+    
+    def evaluate_inputs(
+        self, safety_risks: Optional[str], effective_weather: str, fear_of_heights: bool
+    ) -> CriterionResult:
+        safety_risks = normalized(safety_risks or "")
+        flags = safety_flags(safety_risks)
         
         # Check fear of heights
-        if fear_of_heights and "heights" in safety_risks:
+        if fear_of_heights and flags & SAFETY_HEIGHTS:
             return CriterionResult(
                 matches=False,
                 score=0.0,
-                message="Contains heights exposure"
+                template="Contains heights exposure"
             )
         
         # Check weather-related safety
-        if effective_weather in {"rainy", "snowy", "storm_risk"}:
-            if safety_risks not in ("", "none", "low"):
-                return CriterionResult(
-                    matches=False,
-                    score=0.0,
-                    message=f"Not safe for {effective_weather} weather"
-                )
+        if flags & SAFETY_ELEVATED and effective_weather in UNSAFE_WEATHER:
+            return CriterionResult(
+                matches=False,
+                score=0.0,
+                template="Not safe for {0} weather",
+                args=(effective_weather,)
+            )
         
         # General safety check
-        if safety_risks in ("", "none", "low"):
+        if not flags & SAFETY_ELEVATED:
             return CriterionResult(
                 matches=True,
                 score=1.0,
-                message="Safe trail"
+                template="Safe trail"
             )
         else:
             return CriterionResult(
                 matches=False,
                 score=0.2,
-                message=f"Safety concerns: {safety_risks}"
+                template="Safety concerns: {0}",
+                args=(safety_risks,)
             )
     
     def get_name(self) -> str:
         return "safety"
 
 
-class SeasonCriterion(Criterion):
+class SeasonCriterion(MemoizedCriterion):
     """Evaluates if trail is open during the season."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
-        season = context.get("season", "").lower()
-        closed_seasons = (trail.get("closed_seasons") or "").lower()
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_inputs_cached(trail.get("closed_seasons"), context.season)
+    
+    def evaluate_inputs(self, closed_seasons: Optional[str], season: str) -> CriterionResult:
+        closed_seasons = token_set(closed_seasons or "")
         
         if not season:
             return CriterionResult(
                 matches=True,
                 score=0.8,
-                message="Season not specified"
+                template="Season not specified"
             )
         
         if season in closed_seasons:
             return CriterionResult(
                 matches=False,
                 score=0.0,
-                message=f"Closed in {season}"
+                template="Closed in {0}",
+                args=(season,)
             )
         else:
             return CriterionResult(
                 matches=True,
                 score=1.0,
-                message=f"Open in {season}"
+                template="Open in {0}",
+                args=(season,)
             )
     
     def get_name(self) -> str:
         return "season"
 
 
-class LandscapeCriterion(Criterion):
+class LandscapeCriterion(MemoizedCriterion):
     """Evaluates if trail landscapes match user preferences."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
-        user_preferences = user.get("preferences", [])
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_inputs_cached(
+            trail.get("landscapes"), user.preferences, user.preferences_lower, user.preference_set
+        )
+    
+    def evaluate_inputs(
+        self,
+        landscapes: Optional[str],
+        user_preferences: Tuple[str, ...],
+        preferences_lower: Tuple[str, ...],
+        preference_set: FrozenSet[str]
+    ) -> CriterionResult:
         if not user_preferences:
             return CriterionResult(
                 matches=True,
                 score=0.5,
-                message="No landscape preferences"
+                template="No landscape preferences"
             )
         
-        trail_landscapes = [
-            l.strip().lower() 
-            for l in (trail.get("landscapes") or "").split(",") 
-            if l.strip()
-        ]
-        
-        # Check if any preference matches
-        matches = [pref.lower() for pref in user_preferences if pref.lower() in trail_landscapes]
+        trail_landscapes = token_set(landscapes or "")
         
-        if matches:
+        # Check if any preference matches (kept in preference order for the message)
+        if not preference_set.isdisjoint(trail_landscapes):
+            matches = [pref for pref in preferences_lower if pref in trail_landscapes]
             match_ratio = len(matches) / len(user_preferences)
             return CriterionResult(
                 matches=True,
                 score=min(1.0, match_ratio * 1.2),  # Bonus for multiple matches
-                message=f"Matches preferences: {', '.join(matches)}"
+                template="Matches preferences: {0}",
+                args=(', '.join(matches),)
             )
         else:
             return CriterionResult(
                 matches=False,
                 score=0.0,
-                message=f"Doesn't match preferences: {', '.join(user_preferences)}"
+                template="Doesn't match preferences: {0}",
+                args=(', '.join(user_preferences),)
             )
     
     def get_name(self) -> str:
         return "landscape"
 
 
-class WeatherCriterion(Criterion):
+class WeatherCriterion(MemoizedCriterion):
     """Evaluates if forecasted weather matches desired weather."""
     
-    def evaluate(self, trail: Dict, user: Dict, context: Dict) -> CriterionResult:
-        desired_weather = context.get("weather", "sunny").lower()
-        forecast_weather = trail.get("forecast_weather")
-        hike_date = context.get("hike_start_date") or context.get("hike_date")
-        
-        if not hike_date:
+    def evaluate_profile(self, trail: Dict, user: UserProfile, context: ContextProfile) -> CriterionResult:
+        return self.evaluate_inputs_cached(
+            trail.get("forecast_weather"), context.weather, bool(context.hike_date)
+        )
+    
+    def evaluate_inputs(
+        self, forecast_weather: Optional[str], desired_weather: str, has_hike_date: bool
+    ) -> CriterionResult:
+        if not has_hike_date:
             return CriterionResult(
                 matches=True,
                 score=0.5,
-                message="No hike date specified"
+                template="No hike date specified"
             )
         
         if forecast_weather is None:
@@ -497,55 +725,56 @@ class WeatherCriterion(Criterion):
             return CriterionResult(
                 matches=True,
                 score=0.5,
-                message="Weather forecast unavailable"
+                template="Weather forecast unavailable"
             )
         
-        forecast_weather = forecast_weather.lower()
+        forecast_weather = normalized(forecast_weather)
         
         # Exact match
         if desired_weather == forecast_weather:
             return CriterionResult(
                 matches=True,
                 score=1.0,
-                message=f"Weather matches: {forecast_weather}"
+                template="Weather matches: {0}",
+                args=(forecast_weather,)
             )
         
         # Compatible matches
-        if desired_weather == "sunny" and forecast_weather == "cloudy":
-            return CriterionResult(
-                matches=True,
-                score=0.8,
-                message="Weather acceptable: cloudy (desired sunny)"
-            )
-        
-        if desired_weather == "rainy" and forecast_weather == "cloudy":
+        score = COMPATIBLE_WEATHER.get((desired_weather, forecast_weather))
+        if score is not None:
             return CriterionResult(
                 matches=True,
-                score=0.7,
-                message="Weather acceptable: cloudy (desired rainy)"
+                score=score,
+                template="Weather acceptable: {0} (desired {1})",
+                args=(forecast_weather, desired_weather)
             )
         
         # Mismatch
         return CriterionResult(
             matches=False,
             score=0.0,
-            message=f"Weather mismatch: {forecast_weather} (desired {desired_weather})"
+            template="Weather mismatch: {0} (desired {1})",
+            args=(forecast_weather, desired_weather)
         )
     
     def get_name(self) -> str:
         return "weather"
 
 
+# Criteria keep no per-request state (see Criterion.prepare), so one set of
+# instances is shared by every scorer
+_DEFAULT_CRITERIA: Tuple[Criterion, ...] = (
+    DifficultyCriterion(weight=1.5),
+    DurationCriterion(weight=2.0),  # Most important
+    DistanceCriterion(weight=1.0),
+    ElevationCriterion(weight=1.2),
+    SafetyCriterion(weight=2.5),  # Critical
+    SeasonCriterion(weight=1.5),
+    LandscapeCriterion(weight=1.0),
+    WeatherCriterion(weight=2.0),  # Increased weight to ensure weather is properly considered
+)
+
+
 def get_default_criteria() -> List[Criterion]:
     """Get the default set of criteria with appropriate weights."""
-    return [
-        DifficultyCriterion(weight=1.5),
-        DurationCriterion(weight=2.0),  # Most important
-        DistanceCriterion(weight=1.0),
-        ElevationCriterion(weight=1.2),
-        SafetyCriterion(weight=2.5),  # Critical
-        SeasonCriterion(weight=1.5),
-        LandscapeCriterion(weight=1.0),
-        WeatherCriterion(weight=2.0),  # Increased weight to ensure weather is properly considered
-    ]
-
+    return list(_DEFAULT_CRITERIA)
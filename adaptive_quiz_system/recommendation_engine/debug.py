@@ -5,9 +5,30 @@ Tracks the entire pipeline execution for diagnostics.
 """
 
 from typing import Dict, List, Optional, Any
-from collections import defaultdict
+from bisect import bisect_left
+from dataclasses import dataclass, fields
 import json
 
+# Only the first filtered-out trails are kept in detail; the rest are counted
+MAX_FILTERED_OUT_LOGGED = 100
+
+
+@dataclass(slots=True)
+class DebugStats:
+    """Pipeline statistics; each field stays None until its stage logs it."""
+    scoring: Optional[Dict] = None
+    ranking: Optional[Dict] = None
+    fallbacks: Optional[List[Dict]] = None
+    
+    def to_dict(self) -> Dict:
+        """The logged statistics, keyed by field name."""
+        stats = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is not None:
+                stats[field.name] = value
+        return stats
+
 
 class RecommendationDebugger:
     """Tracks recommendation pipeline execution for debugging and diagnostics."""
@@ -21,9 +42,10 @@ class RecommendationDebugger:
         self.stages = []
         self.current_stage = None
         self.filtered_out_trails = []
+        self.filtered_out_count = 0
         self.warnings = []
         self.errors = []
-        self.stats = defaultdict(dict)
+        self.stats = DebugStats()
     
     def start_stage(self, stage_name: str, context: Dict = None):
         """Start tracking a new stage."""
@@ -63,6 +85,9 @@ class RecommendationDebugger:
         if not self.enabled:
             return
         
+        self.filtered_out_count += 1
+        if len(self.filtered_out_trails) >= MAX_FILTERED_OUT_LOGGED:
+            return
         self.filtered_out_trails.append({
             "trail_id": trail_id,
             "reason": reason,
@@ -75,17 +100,19 @@ class RecommendationDebugger:
         if not self.enabled or not scored_trails:
             return
         
-        scores = [t.get("relevance_percentage", 0) for t in scored_trails]
+        # One sort gives min, max, median and the threshold counts (bisect)
+        scores = sorted(t.get("relevance_percentage", 0) for t in scored_trails)
         if scores:
-            self.stats["scoring"] = {
-                "min_score": min(scores),
-                "max_score": max(scores),
-                "avg_score": sum(scores) / len(scores),
-                "median_score": sorted(scores)[len(scores) // 2],
+            count = len(scores)
+            self.stats.scoring = {
+                "min_score": scores[0],
+                "max_score": scores[-1],
+                "avg_score": sum(scores) / count,
+                "median_score": scores[count // 2],
                 "total_scored": len(scored_trails),
-                "scores_above_80": len([s for s in scores if s >= 80]),
-                "scores_above_60": len([s for s in scores if s >= 60]),
-                "scores_above_40": len([s for s in scores if s >= 40])
+                "scores_above_80": count - bisect_left(scores, 80),
+                "scores_above_60": count - bisect_left(scores, 60),
+                "scores_above_40": count - bisect_left(scores, 40)
             }
     
     def log_ranking_results(self, exact_matches: int, suggestions: int, threshold: float):
@@ -93,7 +120,7 @@ class RecommendationDebugger:
         if not self.enabled:
             return
         
-        self.stats["ranking"] = {
+        self.stats.ranking = {
             "exact_matches": exact_matches,
             "suggestions": suggestions,
             "threshold_used": threshold
@@ -124,10 +151,10 @@ class RecommendationDebugger:
         if not self.enabled:
             return
         
-        if "fallbacks" not in self.stats:
-            self.stats["fallbacks"] = []
+        if self.stats.fallbacks is None:
+            self.stats.fallbacks = []
         
-        self.stats["fallbacks"].append({
+        self.stats.fallbacks.append({
             "level": level,
             "reason": reason,
             "filters_before": filters_before.copy(),
@@ -142,9 +169,9 @@ class RecommendationDebugger:
         return {
             "enabled": True,
             "stages": self.stages,
-            "filtered_out_trails": self.filtered_out_trails[:100],  # Limit to first 100
-            "filtered_out_count": len(self.filtered_out_trails),
-            "stats": dict(self.stats),
+            "filtered_out_trails": self.filtered_out_trails,  # First MAX_FILTERED_OUT_LOGGED only
+            "filtered_out_count": self.filtered_out_count,
+            "stats": self.stats.to_dict(),
             "warnings": self.warnings,
             "errors": self.errors,
             "summary": self._generate_summary()
@@ -155,14 +182,14 @@ class RecommendationDebugger:
         summary = {
             "total_stages": len(self.stages),
             "completed_stages": len([s for s in self.stages if s.get("completed")]),
-            "total_filtered_out": len(self.filtered_out_trails),
+            "total_filtered_out": self.filtered_out_count,
             "total_warnings": len(self.warnings),
             "total_errors": len(self.errors)
         }
         
-        if "fallbacks" in self.stats:
-            summary["fallback_levels_used"] = [f["level"] for f in self.stats["fallbacks"]]
-            summary["max_fallback_level"] = max([f["level"] for f in self.stats["fallbacks"]]) if self.stats["fallbacks"] else 0
+        if self.stats.fallbacks is not None:
+            summary["fallback_levels_used"] = [f["level"] for f in self.stats.fallbacks]
+            summary["max_fallback_level"] = max([f["level"] for f in self.stats.fallbacks]) if self.stats.fallbacks else 0
         
         return summary
     
@@ -175,6 +202,7 @@ class RecommendationDebugger:
         self.stages = []
         self.current_stage = None
         self.filtered_out_trails = []
+        self.filtered_out_count = 0
         self.warnings = []
         self.errors = []
-        self.stats = defaultdict(dict)
+        self.stats = DebugStats()
@@ -4,10 +4,12 @@ Main recommendation engine.
 Orchestrates filtering, scoring, ranking, and enrichment.
 """
 
+import heapq
 from typing import Dict, List, Tuple, Optional
+from itertools import islice
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
-from backend.db import get_all_trails, filter_trails
+from backend.db import cached_trails
 from .filters import FilterBuilder
 from .scorer import TrailScorer
 from .ranker import TrailRanker
@@ -21,6 +23,11 @@ from .config import (
 
 
 
+def _rank_key(trail: Dict) -> Tuple:
+    """Sort key for scored trails: relevance, then popularity."""
+    return (trail.get("relevance_percentage", 0), trail.get("popularity", 0))
+
+
 class RecommendationEngine:
     """Main recommendation engine for adaptive trail recommendations."""
     
@@ -121,7 +128,7 @@ class RecommendationEngine:
                 self.debugger.add_warning("No candidate trails found after all fallback levels")
                 # Last resort: get all trails
                 try:
-                    candidate_trails = get_all_trails()
+                    candidate_trails = [dict(t) for t in cached_trails()]
                     self.debugger.log_fallback_triggered(7, "No candidates after all fallbacks", filters, {"is_real": True})
                 except Exception as e:
                     self.debugger.add_error("Failed to get all trails", e)
@@ -130,7 +137,8 @@ class RecommendationEngine:
             # Step 3: Score all trails (without weather - faster)
             try:
                 self.debugger.start_stage("scoring")
-                scored_trails = self.scorer.score_trails(candidate_trails, user, context)
+                # Criteria messages are only formatted for the trails returned (see describe_trails below)
+                scored_trails = self.scorer.score_trails(candidate_trails, user, context, describe=False)
                 self.debugger.log_scoring_stats(scored_trails)
                 self.debugger.end_stage({"scored_count": len(scored_trails)})
                 
@@ -150,14 +158,9 @@ class RecommendationEngine:
                 hike_date = context.get("hike_start_date") or context.get("hike_date")
                 
                 if hike_date and scored_trails:
-                    # Sort by score to get top trails
-                    scored_trails_sorted = sorted(
-                        scored_trails,
-                        key=lambda x: (x.get("relevance_percentage", 0), x.get("popularity", 0)),
-                        reverse=True
-                    )
                     # Fetch weather for top 15 scored trails (limits API calls to avoid Open-Meteo rate limits)
-                    top_scored_trails = scored_trails_sorted[:15]
+                    # (nlargest matches sorted(...)[:15], ties included, without sorting all trails)
+                    top_scored_trails = heapq.nlargest(15, scored_trails, key=_rank_key)
                     
                     enriched_trails_list = self.weather_enricher.enrich_trails(top_scored_trails, hike_date, max_trails=15)
                     enriched_map = {t["trail_id"]: t for t in enriched_trails_list}
@@ -187,14 +190,14 @@ class RecommendationEngine:
             
             if ALWAYS_RETURN_RESULTS and not exact_matches and not suggestions:
                 self.debugger.add_warning("No results after ranking, using fallback to top scored trails")
-                scored_trails.sort(
-                    key=lambda x: (x.get("relevance_percentage", 0), x.get("popularity", 0)),
-                    reverse=True
-                )
+                scored_trails.sort(key=_rank_key, reverse=True)
                 # For multi-day trips, only include trails that meet min_duration requirement
+                # (stops scanning once max_suggestions trails qualify)
                 if min_duration_required:
-                    filtered_trails = [t for t in scored_trails if t.get("duration", 0) >= min_duration_required]
-                    suggestions = filtered_trails[:max_suggestions] if filtered_trails else []
+                    suggestions = list(islice(
+                        (t for t in scored_trails if t.get("duration", 0) >= min_duration_required),
+                        max_suggestions
+                    ))
                 else:
                     suggestions = scored_trails[:max_suggestions]
             
@@ -228,16 +231,16 @@ class RecommendationEngine:
             if ALWAYS_RETURN_RESULTS and len(exact_matches) + len(suggestions) < MIN_RESULTS_TO_RETURN:
                 all_trails = exact_matches + suggestions
                 if len(all_trails) < MIN_RESULTS_TO_RETURN:
-                    # Add more from scored trails
-                    scored_trails.sort(
-                        key=lambda x: (x.get("relevance_percentage", 0), x.get("popularity", 0)),
-                        reverse=True
-                    )
+                    # Add more from scored trails (a no-op pass if Step 6 sorted them)
+                    scored_trails.sort(key=_rank_key, reverse=True)
+                    # Results are the scored trail dicts themselves, so identity
+                    # replaces the dict-equality scans of `trail not in all_trails`
+                    seen = {id(t) for t in all_trails}
                     for trail in scored_trails:
                         # For multi-day trips, only add trails that meet min_duration
                         if min_duration_required and trail.get("duration", 0) < min_duration_required:
                             continue
-                        if trail not in all_trails and len(suggestions) < max_suggestions * 2:
+                        if id(trail) not in seen and len(suggestions) < max_suggestions * 2:
                             suggestions.append(trail)
                             if len(exact_matches) + len(suggestions) >= MIN_RESULTS_TO_RETURN:
                                 break
@@ -421,6 +424,9 @@ class RecommendationEngine:
                 # Continue without collaborative recommendations - this is not critical
                 collaborative_trails = []
             
+            # Format criteria messages for the returned trails only
+            self.scorer.describe_trails(exact_matches + suggestions + collaborative_trails)
+            
             # Build metadata with debug info
             hike_date = context.get("hike_start_date") or context.get("hike_date")
             
@@ -485,24 +491,31 @@ class RecommendationEngine:
         time_available = context.get("time_available", 0)
         is_multi_day_trip = time_available >= 1440
         original_min_duration = filters.get("min_duration") if is_multi_day_trip else None
+        tried_filters = set()
         
         for level in range(1, MAX_FILTER_RELAXATION_LEVELS + 1):
-            self.debugger.start_stage(f"candidate_filtering_level_{level}")
-            self.debugger.log_filter_application(filters, 0, 0)  # We don't know before count
+            # A relaxation can leave the filters as they were at an earlier
+            # level, which found nothing: skip straight to the next one
+            filter_key = self._filters_key(filters)
+            if filter_key is None or filter_key not in tried_filters:
+                if filter_key is not None:
+                    tried_filters.add(filter_key)
+                self.debugger.start_stage(f"candidate_filtering_level_{level}")
+                self.debugger.log_filter_application(filters, 0, 0)  # We don't know before count
             
-            try:
-                candidate_trails = self._get_candidate_trails(filters)
-                candidates_before = len(candidate_trails) if level == 1 else 0
-                self.debugger.log_filter_application(filters, candidates_before, len(candidate_trails))
-                self.debugger.end_stage({"candidates": len(candidate_trails), "level": level})
+                try:
+                    candidate_trails = self._get_candidate_trails(filters)
+                    candidates_before = len(candidate_trails) if level == 1 else 0
+                    self.debugger.log_filter_application(filters, candidates_before, len(candidate_trails))
+                    self.debugger.end_stage({"candidates": len(candidate_trails), "level": level})
                 
-                if candidate_trails:
-                    if level > 1:
-                        self.debugger.log_fallback_triggered(level, f"No candidates at level {level-1}", original_filters, filters)
-                    return candidate_trails, level
+                    if candidate_trails:
+                        if level > 1:
+                            self.debugger.log_fallback_triggered(level, f"No candidates at level {level-1}", original_filters, filters)
+                        return candidate_trails, level
                 
-            except Exception as e:
-                self.debugger.add_error(f"Filtering failed at level {level}", e)
+                except Exception as e:
+                    self.debugger.add_error(f"Filtering failed at level {level}", e)
             
             # Prepare next fallback level
             if level == 1:
@@ -523,6 +536,14 @@ class RecommendationEngine:
         # If we get here, all fallbacks failed
         return [], fallback_level
     
+    @staticmethod
+    def _filters_key(filters: Dict) -> Optional[frozenset]:
+        """Hashable form of a filter dict, or None if a value is unhashable."""
+        try:
+            return frozenset(filters.items())
+        except TypeError:
+            return None
+    
     def _relax_duration_filters(self, filters: Dict, context: Dict) -> Dict:
         """Relax duration filters (Level 2)."""
         relaxed = filters.copy()
@@ -612,15 +633,10 @@ class RecommendationEngine:
             self.debugger.log_ranking_results(len(exact_matches), len(suggestions), threshold)
             self.debugger.end_stage({"exact": len(exact_matches), "suggestions": len(suggestions), "threshold": threshold})
             
-            # If no results and we can lower threshold more, try again
-            if not exact_matches and not suggestions and threshold_index < len(THRESHOLD_LEVELS) - 1:
-                for next_threshold in THRESHOLD_LEVELS[threshold_index + 1:]:
-                    ranker = TrailRanker(exact_match_threshold=next_threshold)
-                    exact_matches, suggestions = ranker.rank_trails(scored_trails, filters, user, context, debugger)
-                    if exact_matches or suggestions:
-                        self.debugger.add_warning(f"Lowered threshold to {next_threshold}% to get results")
-                        break
-            
+            # No lower-threshold retry: every trail that passes the hard filters
+            # lands in exact_matches or suggestions whatever the threshold, so
+            # empty results mean the hard filters removed everything and
+            # re-ranking at a lower threshold would come back empty as well.
             return exact_matches, suggestions
             
         except Exception as e:
@@ -638,14 +654,9 @@ class RecommendationEngine:
         filter_copy = {k: v for k, v in filters.items() 
                       if k not in ["display_mode", "max_trails", "hide_images"]}
         
-        if filter_copy:
-            # Use database filtering for efficiency
-            trails = filter_trails(filter_copy)
-        else:
-            # No filters, get all trails
-            trails = get_all_trails()
-        
-        return trails
+        # Identical filter dicts (retries, fallback levels) reuse the cached
+        # query; rows are copied because scoring annotates them in place
+        return [dict(t) for t in cached_trails(filter_copy)]
     
     def _extract_display_settings(self, filters: Dict) -> Dict:
         """Extract display settings from filters."""
@@ -6,6 +6,7 @@ Separates exact matches from suggestions and ranks them.
 
 from typing import Dict, List, Tuple, Optional
 from backend.weather_service import weather_matches
+from .criteria import SAFETY_HEIGHTS, normalized, safety_flags, token_set
 import logging
 
 logger = logging.getLogger(__name__)
@@ -110,26 +111,24 @@ class TrailRanker:
             # Season filter
             if filters.get("avoid_closed") and context.get("season"):
                 season = context["season"].lower()
-                closed_seasons = (trail.get("closed_seasons") or "").lower()
-                if season in closed_seasons:
+                if season in token_set(trail.get("closed_seasons") or ""):
                     filtered_out_count["season"] += 1
                     filtered_out = True
                     filter_reason = f"Closed in {season}"
                     if debugger:
                         debugger.log_trail_filtered_out(trail_id, filter_reason, "season")
-                    logger.debug(f"Trail {trail_id} filtered: {filter_reason}")
+                    logger.debug("Trail %s filtered: %s", trail_id, filter_reason)
                     continue
             
             # Fear of heights
             if user.get("fear_of_heights"):
-                safety_risks = (trail.get("safety_risks") or "").lower()
-                if "heights" in safety_risks:
+                if safety_flags(normalized(trail.get("safety_risks") or "")) & SAFETY_HEIGHTS:
                     filtered_out_count["fear_of_heights"] += 1
                     filtered_out = True
                     filter_reason = "Contains heights exposure"
                     if debugger:
                         debugger.log_trail_filtered_out(trail_id, filter_reason, "fear_of_heights")
-                    logger.debug(f"Trail {trail_id} filtered: {filter_reason}")
+                    logger.debug("Trail %s filtered: %s", trail_id, filter_reason)
                     continue
             
             # Weather filter (if forecast available and doesn't match)
@@ -149,7 +148,7 @@ class TrailRanker:
                     filter_reason = "Storm risk forecast"
                     if debugger:
                         debugger.log_trail_filtered_out(trail_id, filter_reason, "weather")
-                    logger.debug(f"Trail {trail_id} filtered: {filter_reason}")
+                    logger.debug("Trail %s filtered: %s", trail_id, filter_reason)
                     continue
                 
                 # For other weather conditions, let them through
@@ -4,8 +4,16 @@ Scoring system for trail recommendations.
 Calculates relevance scores based on multiple criteria.
 """
 
-from typing import Dict, List
-from .criteria import Criterion, CriterionResult, get_default_criteria
+from typing import Dict, List, Optional, Tuple
+from .criteria import (
+    ContextProfile,
+    Criterion,
+    CriterionResult,
+    UserProfile,
+    get_default_criteria,
+    preprocess_context,
+    preprocess_user,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,34 +35,42 @@ class TrailScorer:
                 "relevance_percentage": float,  # 0-100
                 "matched_criteria": List[str],
                 "unmatched_criteria": List[str],
-                "criterion_results": List[CriterionResult]
+                "criterion_results": List[Dict]  # matches, score, message, weight
             }
         """
-        criterion_results = []
+        profile = preprocess_user(user)
+        context_profile = preprocess_context(context)
+        return self._combine_results(
+            [criterion.evaluate_profile(trail, profile, context_profile) for criterion in self.criteria],
+            self._criteria_table()
+        )
+    
+    def _criteria_table(self) -> Tuple[Tuple[float, ...], Tuple[str, ...], float]:
+        """Weights, names and total weight of the criteria, read once per scoring call."""
+        weights = tuple(criterion.weight for criterion in self.criteria)
+        names = tuple(criterion.get_name() for criterion in self.criteria)
+        return weights, names, sum(weights, 0.0)
+    
+    def _combine_results(
+        self,
+        criterion_results: List[CriterionResult],
+        table: Tuple[Tuple[float, ...], Tuple[str, ...], float],
+        describe: bool = True
+    ) -> Dict:
+        """Aggregate one trail's criterion results (in self.criteria order) into its score data."""
+        weights, names, total_weight = table
+        weighted_score = 0.0
+        # Names only: the ranker needs which criteria failed, the messages
+        # are added by _describe_results
         matched_criteria = []
         unmatched_criteria = []
-        total_weight = 0.0
-        weighted_score = 0.0
         
-        # Evaluate all criteria
-        for criterion in self.criteria:
-            result = criterion.evaluate(trail, user, context)
-            criterion_results.append(result)
-            
-            weight = criterion.weight
-            total_weight += weight
-            
+        for weight, name, result in zip(weights, names, criterion_results):
             if result.matches:
                 weighted_score += result.score * weight
-                matched_criteria.append({
-                    "name": criterion.get_name(),
-                    "message": result.message
-                })
+                matched_criteria.append({"name": name})
             else:
-                unmatched_criteria.append({
-                    "name": criterion.get_name(),
-                    "message": result.message
-                })
+                unmatched_criteria.append({"name": name})
         
         # Calculate final scores
         if total_weight == 0:
@@ -64,7 +80,7 @@ class TrailScorer:
             final_score = weighted_score / total_weight
             relevance = final_score * 100.0
         
-        return {
+        score_data = {
             "score": final_score,
             "relevance_percentage": relevance,
             "matched_criteria": matched_criteria,
@@ -72,20 +88,130 @@ class TrailScorer:
             "criterion_results": criterion_results,
             "total_weight": total_weight
         }
+        if describe:
+            score_data.update(self._describe_results(criterion_results, names))
+        return score_data
+    
+    def _describe_results(self, criterion_results: List[CriterionResult], names: Tuple[str, ...]) -> Dict:
+        """
+        Build the matched/unmatched criteria lists, formatting each result's message.
+        
+        criterion_results is replaced by plain matches/score/message/weight
+        dicts, so described trails serialize (jsonify) with the formatted
+        message rather than the CriterionResult template and args.
+        """
+        matched_criteria = []
+        unmatched_criteria = []
+        serialized_results = []
+        
+        for name, result in zip(names, criterion_results):
+            message = result.message
+            entry = {
+                "name": name,
+                "message": message
+            }
+            if result.matches:
+                matched_criteria.append(entry)
+            else:
+                unmatched_criteria.append(entry)
+            serialized_results.append({
+                "matches": result.matches,
+                "score": result.score,
+                "message": message,
+                "weight": result.weight
+            })
+        
+        return {
+            "matched_criteria": matched_criteria,
+            "unmatched_criteria": unmatched_criteria,
+            "criterion_results": serialized_results
+        }
     
-    def score_trails(self, trails: List[Dict], user: Dict, context: Dict) -> List[Dict]:
-        """Score multiple trails."""
+    def describe_trails(self, trails: List[Dict]) -> None:
+        """
+        Add the messages to the criteria of trails scored with describe=False.
+        
+        Trails already described (or never scored) are left untouched.
+        """
+        names = self._criteria_table()[1]
+        for trail in trails:
+            results = trail.get("criterion_results")
+            if results and isinstance(results[0], CriterionResult):
+                trail.update(self._describe_results(results, names))
+    
+    def _evaluate_columns(
+        self, trails: List[Dict], profile: UserProfile, context_profile: ContextProfile
+    ) -> Tuple[List[List[Optional[CriterionResult]]], Dict[int, Exception]]:
+        """
+        Evaluate every criterion over the batch, one column per criterion.
+        
+        The first criterion that raises for a trail (in criteria order) fails
+        the whole trail, so that trail is left out of the remaining criteria
+        and its later column slots are None.
+        
+        Returns:
+            (columns, failures) where failures maps a trail index to the
+            exception that failed it
+        """
+        n = len(trails)
+        failures = {}
+        live = None  # indices still evaluated, None while no trail has failed
+        columns = []
+        
+        for criterion in self.criteria:
+            if live is None:
+                column = criterion.evaluate_batch(trails, profile, context_profile)
+                indices = range(n)
+            else:
+                results = criterion.evaluate_batch([trails[i] for i in live], profile, context_profile)
+                column = [None] * n
+                for i, result in zip(live, results):
+                    column[i] = result
+                indices = live
+            
+            failed = [i for i in indices if isinstance(column[i], Exception)]
+            if failed:
+                for i in failed:
+                    failures[i] = column[i]
+                live = [i for i in indices if i not in failures]
+            columns.append(column)
+        
+        return columns, failures
+    
+    def score_trails(self, trails: List[Dict], user: Dict, context: Dict, describe: bool = True) -> List[Dict]:
+        """
+        Score multiple trails.
+        
+        The user and context are preprocessed once, each criterion evaluates
+        the whole batch in one call (see Criterion.evaluate_batch), then the
+        results are combined per trail.
+        
+        With describe=False the matched/unmatched criteria only carry their
+        names (enough for the ranker) and no message is formatted; call
+        describe_trails on the trails that are actually shown.
+        """
         logger.debug(f"Scoring {len(trails)} trails with {len(self.criteria)} criteria")
         scored_trails = []
         errors = 0
         
-        for trail in trails:
-            try:
-                score_data = self.score_trail(trail, user, context)
+        try:
+            profile = preprocess_user(user)
+            context_profile = preprocess_context(context)
+        except Exception as e:
+            # Unusable user/context: every trail falls back to the default scores
+            columns, failures = [], dict.fromkeys(range(len(trails)), e)
+        else:
+            columns, failures = self._evaluate_columns(trails, profile, context_profile)
+        rows = zip(*columns) if columns else [()] * len(trails)
+        table = self._criteria_table()
+        
+        for index, (trail, criterion_results) in enumerate(zip(trails, rows)):
+            e = failures.get(index)
+            if e is None:
                 trail_copy = trail.copy()
-                trail_copy.update(score_data)
+                trail_copy.update(self._combine_results(list(criterion_results), table, describe))
                 scored_trails.append(trail_copy)
-            except Exception as e:
+            else:
                 errors += 1
                 logger.warning(f"Error scoring trail {trail.get('trail_id', 'unknown')}: {e}")
                 # Add default scores for failed trails
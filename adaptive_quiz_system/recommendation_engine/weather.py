@@ -4,22 +4,83 @@ Batch weather fetching for trail recommendations.
 Efficiently fetches weather forecasts for multiple trails using parallel requests.
 """
 
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor
 from backend.weather_service import get_weather_for_trail
 
+# A fetched forecast is reused for this many seconds
+FORECAST_TTL = 6 * 60 * 60
+FORECAST_CACHE_SIZE = 10000
+
+
+class ForecastCache:
+    """
+    Thread-safe TTL cache of forecasts keyed by (lat, lon, date) bucket.
+    
+    The engine is built per request, so the cache lives at module level
+    (SHARED_FORECAST_CACHE) to be reused across recommend() calls.
+    """
+    
+    def __init__(self, ttl: float = FORECAST_TTL, maxsize: int = FORECAST_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (fetched_at, forecast), oldest first
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Optional[str]:
+        """Cached forecast for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            return entry[1]
+    
+    def set(self, key, forecast: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), forecast)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SHARED_FORECAST_CACHE = ForecastCache()
+
 
 class WeatherEnricher:
     """Enriches trails with weather forecast data using parallel fetching."""
     
-    def __init__(self, max_workers: int = 4):
+    # Fetches in progress across all enrichers, by cache key: a concurrent
+    # request for the same location waits for that call instead of repeating it
+    _inflight: Dict[tuple, Future] = {}
+    _inflight_lock = threading.Lock()
+    
+    def __init__(self, max_workers: int = 4, cache: Optional[ForecastCache] = None):
         """
         Args:
             max_workers: Maximum number of parallel weather API requests (kept low to avoid Open-Meteo rate limits)
+            cache: Forecast cache keyed by _cache_key (defaults to SHARED_FORECAST_CACHE)
         """
-        self._cache = {}  # Simple in-memory cache: {(lat, lon, date): weather}
+        self._cache = cache if cache is not None else SHARED_FORECAST_CACHE
         self.max_workers = max_workers
     
+    @staticmethod
+    def _cache_key(lat, lon, hike_date: str) -> tuple:
+        """Trails within ~1 km (0.01 degree) share one forecast and one API call."""
+        try:
+            return (round(float(lat), 2), round(float(lon), 2), hike_date)
+        except (TypeError, ValueError):
+            return (lat, lon, hike_date)
+    
     def enrich_trails(
         self, 
         trails: List[Dict], 
@@ -52,11 +113,12 @@ class WeatherEnricher:
             trail_copy = trail.copy()
             lat = trail.get("latitude")
             lon = trail.get("longitude")
-            cache_key = (lat, lon, hike_date) if lat and lon else None
+            cache_key = self._cache_key(lat, lon, hike_date) if lat and lon else None
+            forecast = self._cache.get(cache_key) if cache_key else None
             
-            if cache_key and cache_key in self._cache:
+            if forecast is not None:
                 # Use cached value
-                trail_copy["forecast_weather"] = self._cache[cache_key]
+                trail_copy["forecast_weather"] = forecast
                 enriched.append(trail_copy)
             elif lat and lon:
                 # Need to fetch weather
@@ -82,41 +144,57 @@ class WeatherEnricher:
         trails_with_keys: List[tuple], 
         hike_date: str
     ) -> List[Dict]:
-        """Fetch weather for multiple trails in parallel."""
-        results = {}
+        """Fetch weather for multiple trails in parallel, one request per cache key."""
+        groups = {}
+        for trail_copy, cache_key in trails_with_keys:
+            groups.setdefault(cache_key, []).append(trail_copy)
+        
+        # Claim the locations nobody is fetching; wait on the others
+        owned = {}
+        pending = {}
+        with self._inflight_lock:
+            for cache_key in groups:
+                future = self._inflight.get(cache_key)
+                if future is None:
+                    future = Future()
+                    self._inflight[cache_key] = future
+                    owned[cache_key] = future
+                pending[cache_key] = future
         
         def fetch_single(trail_copy, cache_key):
-            """Fetch weather for a single trail."""
+            """Fetch weather for a single location and publish it to waiters."""
+            forecast = None
             try:
                 forecast = get_weather_for_trail(trail_copy, hike_date)
-                if cache_key:
-                    self._cache[cache_key] = forecast
-                trail_copy["forecast_weather"] = forecast
-                return trail_copy
+                # None (API error, rate limit, date out of range) is not cached
+                # so the next request retries it
+                if cache_key and forecast is not None:
+                    self._cache.set(cache_key, forecast)
             except Exception as e:
                 # Graceful degradation: continue without weather
-                trail_copy["forecast_weather"] = None
-                return trail_copy
+                forecast = None
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(cache_key, None)
+                owned[cache_key].set_result(forecast)
         
-        # Use ThreadPoolExecutor for parallel requests
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_trail = {
-                executor.submit(fetch_single, trail_copy, cache_key): trail_copy
-                for trail_copy, cache_key in trails_with_keys
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_trail):
-                try:
-                    result = future.result()
-                    results[id(result)] = result
-                except Exception as e:
-                    trail = future_to_trail[future]
-                    trail["forecast_weather"] = None
+        if owned:
+            # Use ThreadPoolExecutor for parallel requests
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # One task per location; the first trail of the group is fetched
+                for cache_key in owned:
+                    executor.submit(fetch_single, groups[cache_key][0], cache_key)
+        
+        for cache_key, future in pending.items():
+            try:
+                forecast = future.result()
+            except Exception as e:
+                forecast = None
+            for trail_copy in groups[cache_key]:
+                trail_copy["forecast_weather"] = forecast
         
         # Return in original order
-        return [results[id(trail_copy)] for trail_copy, _ in trails_with_keys]
+        return [trail_copy for trail_copy, _ in trails_with_keys]
     
     def clear_cache(self):
         """Clear the weather cache."""
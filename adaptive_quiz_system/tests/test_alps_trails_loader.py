@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the trail loader's diversity buckets and elevation profiles.
+"""
+
+import sqlite3
+import unittest
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data_pipeline import alps_trails_loader as loader
+
+
+class TestTrailCategory(unittest.TestCase):
+    """Duration/difficulty buckets used by _select_diverse_trails"""
+
+    def test_difficulty_buckets(self):
+        """Easy < 4.0 <= Medium < 7.0 <= Hard, with 10.0 counted as Hard"""
+        cases = [(0.0, 0), (3.9, 0), (4.0, 1), (6.9, 1), (7.0, 2), (9.9, 2), (10.0, 2)]
+        for difficulty, expected in cases:
+            with self.subTest(difficulty=difficulty):
+                category = loader._get_trail_category({"duration": 60, "difficulty": difficulty})
+                self.assertEqual(category[1], expected)
+
+    def test_duration_buckets(self):
+        """Each duration edge opens the next bucket"""
+        cases = [(0, 0), (119, 0), (120, 1), (240, 2), (480, 3), (720, 4), (1440, 5), (5000, 5)]
+        for duration, expected in cases:
+            with self.subTest(duration=duration):
+                category = loader._get_trail_category({"duration": duration, "difficulty": 5.0})
+                self.assertEqual(category[0], expected)
+
+
+class TestElevationProfile(unittest.TestCase):
+    """Profile distances are measured along the full polyline"""
+
+    def setUp(self):
+        # Winding trail: many short zigzags, far more vertices than are sampled
+        self.coords = [
+            (6.0 + i * 0.0001, 45.0 + (0.0005 if i % 2 else 0.0))
+            for i in range(loader.MAX_ELEVATION_SAMPLES * 5 + 1)
+        ]
+        self.total_km, self.cumulative = loader._calc_distances(self.coords)
+        indices = loader._sample_indices(len(self.coords), loader.MAX_ELEVATION_SAMPLES)
+        self.sampled = [self.coords[i] for i in indices]
+        self.distances = [self.cumulative[i] for i in indices]
+
+        # Every sampled point is cached, so no elevation request is sent
+        self.cache = sqlite3.connect(":memory:")
+        self.cache.execute(
+            "CREATE TABLE elevations (lat INTEGER, lon INTEGER, elevation REAL, PRIMARY KEY (lat, lon))"
+        )
+        loader._write_elevation_cache(
+            self.cache,
+            {loader._elevation_key(point): 1000.0 + i for i, point in enumerate(self.sampled)}
+        )
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_profile_ends_at_trail_length(self):
+        """The last distance_m is the full trail length, not the sum of sample chords"""
+        [(profile, gain)] = loader._fetch_elevation_profiles([self.sampled], [self.distances], cache=self.cache)
+
+        self.assertEqual(len(profile), len(self.sampled))
+        self.assertEqual(profile[0]["distance_m"], 0.0)
+        self.assertEqual(profile[-1]["distance_m"], round(self.total_km * 1000, 1))
+        chord_km, _ = loader._calc_distances(self.sampled)
+        self.assertGreater(profile[-1]["distance_m"], chord_km * 1000 + 1)
+        self.assertEqual(
+            [point["distance_m"] for point in profile],
+            [round(d * 1000, 1) for d in self.distances]
+        )
+        self.assertEqual(gain, len(self.sampled) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
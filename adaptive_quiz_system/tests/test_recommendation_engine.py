@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the recommendation engine scoring and ranking behaviour.
+"""
+
+import json
+import unittest
+from unittest import mock
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from flask import Flask
+
+from backend import db
+from recommendation_engine.engine import RecommendationEngine
+from recommendation_engine.config import THRESHOLD_LEVELS
+from recommendation_engine.criteria import SeasonCriterion
+from recommendation_engine.ranker import TrailRanker
+from recommendation_engine.scorer import TrailScorer
+
+
+def make_user(**overrides):
+    user = {
+        "id": 1,
+        "experience": "Intermediate",
+        "fitness_level": "Medium",
+        "fear_of_heights": 0,
+        "preferences": ["lake"],
+        "performance": {"persistence_score": 0.7},
+    }
+    user.update(overrides)
+    return user
+
+
+def make_trail(**overrides):
+    trail = {
+        "trail_id": "t1",
+        "name": "Test Trail",
+        "difficulty": 5.0,
+        "distance": 8.0,
+        "duration": 150,
+        "elevation_gain": 300,
+        "landscapes": "lake,forest",
+        "safety_risks": "low",
+        "closed_seasons": "",
+        "popularity": 7.0,
+    }
+    trail.update(overrides)
+    return trail
+
+
+CONTEXT = {"time_available": 180, "weather": "sunny", "season": "summer"}
+
+
+class TestCriterionSerialization(unittest.TestCase):
+    """Described trails must serialize with readable criterion messages"""
+
+    def test_described_trail_json_shape(self):
+        """jsonify output keeps the matches/score/message/weight shape"""
+        scorer = TrailScorer()
+        scored = scorer.score_trails([make_trail()], make_user(), CONTEXT, describe=False)
+        scorer.describe_trails(scored)
+
+        payload = json.loads(Flask(__name__).json.dumps(scored[0]))
+
+        self.assertEqual(len(payload["criterion_results"]), len(scorer.criteria))
+        for result in payload["criterion_results"]:
+            self.assertEqual(set(result), {"matches", "score", "message", "weight"})
+            self.assertNotIn("{0", result["message"])
+        difficulty = payload["criterion_results"][0]
+        self.assertEqual(difficulty["message"], "Difficulty appropriate (5.0 in range 3.0-6.0)")
+        messages = [c["message"] for c in payload["matched_criteria"] + payload["unmatched_criteria"]]
+        self.assertIn(difficulty["message"], messages)
+
+    def test_score_trail_json_shape(self):
+        """The single-trail path used by the explanation endpoints is described too"""
+        result = TrailScorer().score_trail(make_trail(), make_user(), CONTEXT)
+        payload = json.loads(Flask(__name__).json.dumps(result))
+        self.assertTrue(all("message" in r and "template" not in r for r in payload["criterion_results"]))
+
+
+class TestTrailQueryCache(unittest.TestCase):
+    """cached_trails must match the uncached queries"""
+
+    def test_matches_filter_trails(self):
+        """Same trails, same order, as filter_trails and get_all_trails"""
+        filters = {"max_difficulty": 5, "is_real": True}
+        ids = [t["trail_id"] for t in db.cached_trails(filters)]
+        self.assertEqual(ids, [t["trail_id"] for t in db.filter_trails(filters)])
+        self.assertEqual(
+            [t["trail_id"] for t in db.cached_trails()],
+            [t["trail_id"] for t in db.get_all_trails()]
+        )
+
+    def test_filter_results_hold_ids_within_bound(self):
+        """Filter queries keep only ids, least recently used dropped past the bound"""
+        cache = db._TrailCache(max_ids=150)
+        for max_difficulty in (3, 4, 5, 6):
+            trails = cache.get(frozenset({"max_difficulty": max_difficulty}.items()))
+            self.assertTrue(trails)
+        self.assertLessEqual(cache.query_ids, 150)
+        for ids in cache.queries.values():
+            self.assertTrue(all(isinstance(trail_id, str) for trail_id in ids))
+
+    def test_failed_query_returns_empty(self):
+        """A bad filter value is not cached and yields no trails"""
+        self.assertEqual(db.cached_trails({"max_difficulty": "not a number"}), ())
+
+
+class TestRecommendOutput(unittest.TestCase):
+    """Shape of the trails returned by recommend()"""
+
+    def test_no_internal_keys_in_returned_trails(self):
+        """Engine-internal underscore keys do not leak into the API/template data"""
+        result = RecommendationEngine(debug_enabled=False).recommend(make_user(), dict(CONTEXT))
+        trails = result["exact_matches"] + result["suggestions"] + result["collaborative_recommendations"]
+        self.assertTrue(trails)
+        for trail in trails:
+            self.assertEqual([key for key in trail if key.startswith("_")], [])
+
+
+class TestClosedSeasons(unittest.TestCase):
+    """closed_seasons is a comma-separated list of season names, not free text"""
+
+    CASES = [
+        ("winter", True),
+        ("Winter, spring", True),
+        ("spring,winter", True),
+        ("wintertime", False),
+        ("", False),
+        (None, False),
+    ]
+
+    def test_season_criterion(self):
+        """Only a listed season name closes the trail"""
+        for closed_seasons, closed in self.CASES:
+            with self.subTest(closed_seasons=closed_seasons):
+                result = SeasonCriterion().evaluate(
+                    make_trail(closed_seasons=closed_seasons), make_user(), dict(CONTEXT, season="winter")
+                )
+                self.assertEqual(result.matches, not closed)
+
+    def test_ranker_avoid_closed_filter(self):
+        """The avoid_closed hard filter uses the same name lookup"""
+        for closed_seasons, closed in self.CASES:
+            with self.subTest(closed_seasons=closed_seasons):
+                trail = make_trail(closed_seasons=closed_seasons, relevance_percentage=80)
+                exact, suggestions = TrailRanker().rank_trails(
+                    [trail], {"avoid_closed": True}, make_user(), dict(CONTEXT, season="Winter")
+                )
+                self.assertEqual(len(exact) + len(suggestions), 0 if closed else 1)
+
+
+class TestRankingThreshold(unittest.TestCase):
+    """The threshold only splits exact matches from suggestions"""
+
+    def setUp(self):
+        self.trails = [
+            make_trail(trail_id=f"t{i}", relevance_percentage=percentage, closed_seasons=closed)
+            for i, (percentage, closed) in enumerate([(95, ""), (70, ""), (40, ""), (10, "summer")])
+        ]
+        self.filters = {"avoid_closed": True}
+
+    def test_threshold_does_not_change_kept_trails(self):
+        """Every trail passing the hard filters is returned at any threshold"""
+        for threshold in THRESHOLD_LEVELS:
+            with self.subTest(threshold=threshold):
+                exact, suggestions = TrailRanker(exact_match_threshold=threshold).rank_trails(
+                    [dict(t) for t in self.trails], self.filters, make_user(), dict(CONTEXT)
+                )
+                self.assertEqual(sorted(t["trail_id"] for t in exact + suggestions), ["t0", "t1", "t2"])
+
+    def test_empty_result_is_ranked_once(self):
+        """When the hard filters remove everything there is no lower-threshold retry"""
+        engine = RecommendationEngine(debug_enabled=False)
+        closed = [make_trail(trail_id="t0", relevance_percentage=90, closed_seasons="summer")]
+        rank_trails = TrailRanker.rank_trails
+        with mock.patch.object(TrailRanker, "rank_trails", autospec=True, side_effect=rank_trails) as rank:
+            result = engine._rank_with_fallback(
+                closed, self.filters, make_user(), dict(CONTEXT), 1, engine.debugger
+            )
+        self.assertEqual(result, ([], []))
+        self.assertEqual(rank.call_count, 1)
+
+
+class TestExactMatchCriticalCriteria(unittest.TestCase):
+    """Undescribed trails still tell the ranker which criteria failed"""
+
+    def test_failed_duration_is_not_exact_match(self):
+        """A trail longer than the time available stays a suggestion despite its score"""
+        context = dict(CONTEXT, time_available=480)
+        scorer = TrailScorer()
+        [trail] = scorer.score_trails([make_trail(duration=500)], make_user(), context, describe=False)
+        self.assertEqual(trail["unmatched_criteria"], [{"name": "duration"}])
+
+        ranker = TrailRanker(exact_match_threshold=50)
+        self.assertGreater(trail["relevance_percentage"], ranker.exact_match_threshold)
+        exact, suggestions = ranker.rank_trails([trail], {}, make_user(), context)
+        self.assertEqual((len(exact), len(suggestions)), (0, 1))
+
+        scorer.describe_trails(suggestions)
+        self.assertTrue(suggestions[0]["unmatched_criteria"][0]["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()